@@ -2,22 +2,28 @@
 import asyncio
 import logging
 import pathlib
+import signal
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from infrastructure.database.setup import create_engine, create_session_pool
-from infrastructure.database.repo.requests import RequestsRepo
 from tgbot.config import Config, load_config
 from tgbot.middlewares.config import ConfigMiddleware
 from tgbot.middlewares.database import DatabaseMiddleware
-from tgbot.middlewares.apscheduler_middleware import SchedulerMiddleware
+from tgbot.middlewares.scheduler import SchedulerMiddleware
 from tgbot.misc.logging import LoggingPackagePathFilter
 from tgbot.services import broadcaster
+from tgbot.services.invalidation import InvalidationBus
+from tgbot.services.roles import RoleRegistry
+from tgbot.services.scheduler import PostingScheduler
+from tgbot.services.user_cache import UserCache
+from tgbot.services.user_writer import UserWriter
 from tgbot.handlers import routers_list
+from worker import create_bot, setup_scheduling, start_workers, stop_workers
 
 logger = logging.getLogger(__name__)
 
@@ -35,19 +41,26 @@ async def on_startup(bot: Bot, admin_ids: list[int]):
 
 def register_global_middlewares(dp: Dispatcher,
                                 config: Config,
-                                scheduler: AsyncIOScheduler,
-                                session_pool):
+                                scheduler: PostingScheduler,
+                                session_pool,
+                                user_writer: UserWriter,
+                                replica_pool=None):
     """
     Register global middlewares for the given dispatcher.
 
     Args:
         dp (Dispatcher): The dispatcher instance.
         config (Config): The configuration object from the loaded configuration.
+        scheduler (PostingScheduler): The scheduler of the channel posting jobs.
         session_pool: Session pool object for the database using SQLAlchemy.
+        user_writer (UserWriter): The batching writer of the user upserts.
+        replica_pool: Session pool of the read replica, None without one.
     """
     middleware_types = [
         ConfigMiddleware(config),
-        DatabaseMiddleware(session_pool),
+        DatabaseMiddleware(session_pool, user_writer,
+                           replica_pool=replica_pool,
+                           read_your_writes_window=config.db.read_your_writes_window),
         SchedulerMiddleware(scheduler),
     ]
 
@@ -135,23 +148,141 @@ def get_storage(config: Config):
     return MemoryStorage()
 
 
-async def restore_config(config: Config, session_pool) -> None:
-    async with session_pool() as session:
-        repo = RequestsRepo(session)
-        config_parameters = await repo.configs.get_config_parameters()
-        if config_parameters:
-            admin_ids = [int(admin_id)
-                         for admin_id
-                         in config_parameters.admins_ids.split(",")]
-            config.tg_bot.admin_ids = admin_ids
+async def setup_dispatcher(config: Config,
+                           primary: bool = True) -> tuple[Dispatcher, Bot]:
+    """
+    Creates the bot and the dispatcher with the routers, the middlewares and the posting scheduler.
+
+    Args:
+        config (Config): The configuration object.
+        primary (bool): Whether this is the main process, which starts the scheduler workers.
+
+    Returns:
+        tuple[Dispatcher, Bot]: The dispatcher and the bot instance.
+    """
+    storage = get_storage(config)
+
+    bot = create_bot(config)
+    dp = Dispatcher(storage=storage)
+
+    # We register regular routers
+    dp.include_routers(*routers_list)
+
+    engine = await create_engine(config.db, echo=False, processes=config.processes)
+    session_pool = create_session_pool(engine)
+    roles = RoleRegistry(session_pool, config.tg_bot.admin_ids)
+    await roles.load()
+    dp["roles"] = roles
+
+    # the roles and the posting jobs changed on the other replicas
+    bus = InvalidationBus(config.db.construct_listen_dsn())
+
+    async def reload_roles(key: str) -> None:
+        await roles.load()
+
+    bus.subscribe("roles", reload_roles)
+
+    # the pool metrics for the admin commands
+    dp["engine"] = engine
+    replica_pool = None
+    if config.db.replica_host:
+        replica_engine = await create_engine(config.db, echo=False,
+                                             processes=config.processes,
+                                             replica=True)
+        replica_pool = create_session_pool(replica_engine)
+        dp.shutdown.register(replica_engine.dispose)
+
+    scheduler, shutdowns = setup_scheduling(config, bot, engine, session_pool, bus)
+    bus.start()
+    workers = start_workers(config.scheduler.workers) if primary else []
+
+    async def stop_scheduling() -> None:
+        await stop_workers(workers)
+        for shutdown in shutdowns:
+            await shutdown()
+
+    user_writer = UserWriter(session_pool, UserCache())
+    user_writer.start()
 
-            if config_parameters.subadmins_ids:
-                subadmin_ids = [
-                    int(subadmin_id)
-                    for subadmin_id in config_parameters.subadmins_ids.split(",")]
-                config.tg_bot.subadmins_ids = subadmin_ids
-        else:
-            await repo.configs.create_config(config.tg_bot.admin_ids)
+    dp.shutdown.register(bus.shutdown)
+    dp.shutdown.register(stop_scheduling)
+    dp.shutdown.register(user_writer.shutdown)
+    register_global_middlewares(dp, config, scheduler, session_pool, user_writer,
+                                replica_pool)
+    return dp, bot
+
+
+async def serve_webhook(config: Config, primary: bool = True) -> None:
+    """
+    Serves the webhook in this process until it is asked to stop.
+
+    Every webhook process listens on the same port with SO_REUSEPORT and the
+    kernel spreads the connections of Telegram between them. An update is
+    answered right away and handled in the background. The main process
+    registers the webhook and starts the other webhook processes.
+
+    Args:
+        config (Config): The configuration object.
+        primary (bool): Whether this is the main process.
+    """
+    if config.webhook.workers > 1 and not config.tg_bot.use_redis:
+        # the FSM state and the albums being collected live in the memory of one process
+        raise RuntimeError("WEBHOOK_WORKERS > 1 needs USE_REDIS=True")
+
+    dp, bot = await setup_dispatcher(config, primary)
+
+    if primary:
+        servers = start_workers(config.webhook.workers - 1,
+                                target=run_webhook_process,
+                                name="webhook-worker")
+
+        async def register_webhook() -> None:
+            await bot.set_webhook(config.webhook.full_url,
+                                  secret_token=config.webhook.secret,
+                                  allowed_updates=dp.resolve_used_update_types())
+            await on_startup(bot, list(dp["roles"].admins))
+
+        async def stop_servers() -> None:
+            await stop_workers(servers)
+
+        dp.startup.register(register_webhook)
+        dp.shutdown.register(stop_servers)
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp,
+                         bot=bot,
+                         handle_in_background=True,
+                         secret_token=config.webhook.secret).register(
+        app, path=config.webhook.path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner,
+                       config.webhook.host,
+                       config.webhook.port,
+                       reuse_port=config.webhook.workers > 1)
+    await site.start()
+    logger.info("Webhook is served on %s:%s%s",
+                config.webhook.host, config.webhook.port, config.webhook.path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_webhook_process() -> None:
+    """Entry point of the additional webhook processes."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(processName)s - %(name)s - %(message)s',
+    )
+    asyncio.run(serve_webhook(load_config(".env"), primary=False))
 
 
 async def main():
@@ -164,25 +295,15 @@ async def main():
 
     config = load_config(".env")
     # setup_logging(config)
-    storage = get_storage(config)
-
-    bot = Bot(token=config.tg_bot.token,
-              default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher(storage=storage)
-
-    # We register regular routers
-    dp.include_routers(*routers_list)
-
-    engine = await create_engine(config.db, echo=False)
-    session_pool = create_session_pool(engine)
-    await restore_config(config, session_pool)
 
-    # scheduler = AsyncIOScheduler(timezone="Europe/Berlin")
-    scheduler = AsyncIOScheduler()
-    scheduler.start()
-    register_global_middlewares(dp, config, scheduler, session_pool)
+    if config.webhook.enabled:
+        await serve_webhook(config)
+        return
 
-    await on_startup(bot, config.tg_bot.admin_ids)
+    dp, bot = await setup_dispatcher(config)
+    await on_startup(bot, list(dp["roles"].admins))
+    # updates are not delivered by getUpdates while a webhook is set
+    await bot.delete_webhook()
     await dp.start_polling(bot,
                            allowed_updates=dp.resolve_used_update_types())
 
@@ -0,0 +1,268 @@
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# the advisory lock serializing replicas that start at the same time
+MIGRATION_LOCK_KEY = 0x6d696772
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    One step of the schema history.
+
+    Attributes:
+        version (int): The schema version after the step, steps run in this order.
+        description (str): What the step changes.
+        statements (tuple[str, ...]): The SQL statements of the step.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...] = ()
+
+
+# Never edit a released migration, add a new one. The statements stay
+# idempotent, so databases that were upgraded at boot before the migrations
+# existed go through them safely.
+MIGRATIONS = [
+    # the schema as create_all made it at boot before the migrations existed,
+    # frozen here so it never follows later changes of the models
+    Migration(1, "Initial schema", (
+        """
+        CREATE TABLE IF NOT EXISTS config (
+            id SERIAL NOT NULL,
+            admins_ids VARCHAR NOT NULL,
+            subadmins_ids VARCHAR,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__config PRIMARY KEY (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGSERIAL NOT NULL,
+            username VARCHAR,
+            tg_first_name VARCHAR,
+            tg_last_name VARCHAR,
+            tg_username VARCHAR,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__users PRIMARY KEY (user_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix__users__user_id ON users (user_id)",
+        """
+        CREATE TABLE IF NOT EXISTS channels (
+            channel_id BIGSERIAL NOT NULL,
+            name VARCHAR,
+            url VARCHAR,
+            description VARCHAR,
+            channel_job INTEGER NOT NULL,
+            bot_is_on VARCHAR,
+            post_interval INTERVAL NOT NULL,
+            user_id BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__channels PRIMARY KEY (channel_id),
+            CONSTRAINT fk__channels__user_id__users FOREIGN KEY (user_id)
+                REFERENCES users (user_id) ON DELETE CASCADE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix__channels__channel_id ON channels (channel_id)",
+        "CREATE INDEX IF NOT EXISTS ix__channels__name ON channels (name)",
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id BIGSERIAL NOT NULL,
+            text VARCHAR,
+            user_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__posts PRIMARY KEY (id),
+            CONSTRAINT fk__posts__user_id__users FOREIGN KEY (user_id)
+                REFERENCES users (user_id) ON DELETE CASCADE,
+            CONSTRAINT fk__posts__channel_id__channels FOREIGN KEY (channel_id)
+                REFERENCES channels (channel_id) ON DELETE CASCADE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix__posts__id ON posts (id)",
+        """
+        CREATE TABLE IF NOT EXISTS images (
+            id BIGSERIAL NOT NULL,
+            image_id VARCHAR NOT NULL,
+            post_id BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__images PRIMARY KEY (id),
+            CONSTRAINT fk__images__post_id__posts FOREIGN KEY (post_id)
+                REFERENCES posts (id) ON DELETE CASCADE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix__images__image_id ON images (image_id)",
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id BIGSERIAL NOT NULL,
+            idempotency_key VARCHAR NOT NULL,
+            chat_id BIGINT NOT NULL,
+            payload JSONB NOT NULL,
+            status VARCHAR DEFAULT 'pending' NOT NULL,
+            attempts INTEGER DEFAULT 0 NOT NULL,
+            not_before TIMESTAMP DEFAULT now() NOT NULL,
+            locked_until TIMESTAMP,
+            sent_at TIMESTAMP,
+            error VARCHAR,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__outbox PRIMARY KEY (id),
+            CONSTRAINT uq__outbox__idempotency_key UNIQUE (idempotency_key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix__outbox__not_before ON outbox (not_before) "
+        "WHERE status = 'pending'",
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_shards (
+            shard INTEGER NOT NULL,
+            owner VARCHAR,
+            lease_until TIMESTAMP,
+            CONSTRAINT pk__scheduler_shards PRIMARY KEY (shard)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_workers (
+            worker_id VARCHAR NOT NULL,
+            heartbeat_at TIMESTAMP NOT NULL,
+            CONSTRAINT pk__scheduler_workers PRIMARY KEY (worker_id)
+        )
+        """,
+    )),
+    Migration(2, "Post rotation order, posting anchor and misfire policy", (
+        # posts.position: the rotation order of the posts of a channel
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name = 'posts' AND column_name = 'position') THEN
+                ALTER TABLE posts ADD COLUMN position INTEGER;
+                UPDATE posts SET position = numbered.position
+                FROM (SELECT id, row_number() OVER (PARTITION BY channel_id ORDER BY id) AS position
+                      FROM posts) AS numbered
+                WHERE posts.id = numbered.id;
+                ALTER TABLE posts ALTER COLUMN position SET NOT NULL;
+            END IF;
+        END $$
+        """,
+        # also serves every lookup of the posts of a channel
+        "CREATE INDEX IF NOT EXISTS ix__posts__channel_id_position ON posts (channel_id, position)",
+        # channels.last_post_at: the anchor of the posting interval
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS last_post_at TIMESTAMP",
+        # channels.misfire_*: what to do with the posting times missed during downtime
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS misfire_policy VARCHAR",
+        "ALTER TABLE channels ADD COLUMN IF NOT EXISTS misfire_replay_limit INTEGER",
+    )),
+    Migration(3, "Indexes on the foreign keys the queries filter by", (
+        "CREATE INDEX IF NOT EXISTS ix__channels__user_id ON channels (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix__posts__user_id ON posts (user_id)",
+        # the images of a post in the order they are sent
+        "CREATE INDEX IF NOT EXISTS ix__images__post_id_id ON images (post_id, id)",
+    )),
+    Migration(4, "Keyset pagination of the posts of a channel", (
+        "CREATE INDEX IF NOT EXISTS ix__posts__channel_id_id ON posts (channel_id, id)",
+    )),
+    Migration(5, "Roles table instead of the id lists of the config row", (
+        """
+        CREATE TABLE IF NOT EXISTS roles (
+            user_id BIGINT NOT NULL,
+            role VARCHAR NOT NULL,
+            created_at TIMESTAMP DEFAULT now() NOT NULL,
+            CONSTRAINT pk__roles PRIMARY KEY (user_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix__roles__role ON roles (role)",
+        # the lists were stored as "1, 2, 3"
+        """
+        INSERT INTO roles (user_id, role)
+        SELECT DISTINCT trim(id)::BIGINT, 'subadmin'
+        FROM config, unnest(string_to_array(config.subadmins_ids, ',')) AS id
+        WHERE trim(id) <> ''
+        ON CONFLICT (user_id) DO NOTHING
+        """,
+        """
+        INSERT INTO roles (user_id, role)
+        SELECT DISTINCT trim(id)::BIGINT, 'admin'
+        FROM config, unnest(string_to_array(config.admins_ids, ',')) AS id
+        WHERE trim(id) <> ''
+        ON CONFLICT (user_id) DO UPDATE SET role = 'admin'
+        """,
+    )),
+]
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """
+    Returns the version of the database schema with a single query.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+
+    Returns:
+        int: The version, 0 for a database that was never migrated.
+    """
+    async with engine.connect() as conn:
+        try:
+            version = await conn.scalar(text("SELECT max(version) FROM schema_version"))
+        except ProgrammingError:
+            # the version table does not exist yet
+            return 0
+    return version or 0
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """
+    Brings the database schema to the latest version.
+
+    An up to date database costs one query. Otherwise the pending
+    migrations run in one transaction under an advisory lock, so replicas
+    starting together apply them once.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+
+    Returns:
+        int: The schema version.
+    """
+    latest = MIGRATIONS[-1].version
+    if await get_schema_version(engine) >= latest:
+        return latest
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"),
+                           {"key": MIGRATION_LOCK_KEY})
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL DEFAULT now())"))
+        version = await conn.scalar(
+            text("SELECT coalesce(max(version), 0) FROM schema_version"))
+        for migration in MIGRATIONS:
+            if migration.version > version:
+                await apply_migration(conn, migration)
+    return latest
+
+
+async def apply_migration(conn: AsyncConnection, migration: Migration) -> None:
+    """
+    Runs the migration and records its version.
+
+    Args:
+        conn (AsyncConnection): The connection with the migration transaction.
+        migration (Migration): The migration to run.
+    """
+    logger.info("Migrating the schema to version %s: %s",
+                migration.version, migration.description)
+    for statement in migration.statements:
+        await conn.execute(text(statement))
+    await conn.execute(
+        text("INSERT INTO schema_version (version, description) "
+             "VALUES (:version, :description)"),
+        {"version": migration.version, "description": migration.description})
@@ -4,6 +4,9 @@ from .channels import Channel
 from .posts import Post
 from .images import Image
 from .config import Config
+from .outbox import OutboxMessage
+from .shards import SchedulerShard, SchedulerWorker
+from .roles import Role
 
 __all__ = [
     "Base",
@@ -12,4 +15,8 @@ __all__ = [
     "Post",
     "Image",
     "Config",
+    "OutboxMessage",
+    "SchedulerShard",
+    "SchedulerWorker",
+    "Role",
 ]
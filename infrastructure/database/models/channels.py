@@ -1,7 +1,8 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Optional, TYPE_CHECKING
 
 from sqlalchemy import ForeignKey, BigInteger
+from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -24,10 +25,15 @@ class Channel(Base, TimestampMixin):
     bot_is_on: Mapped[Optional[str]] = mapped_column(default="off")
     post_interval: Mapped[timedelta] = mapped_column(
         default=timedelta(days=1, hours=12.0, minutes=0.0, seconds=0.0))
+    last_post_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    # None means the default policy from the scheduler settings
+    misfire_policy: Mapped[Optional[str]]
+    misfire_replay_limit: Mapped[Optional[int]]
     user_id: Mapped[int] = mapped_column(BigInteger,
                                          ForeignKey("users.user_id",
                                                     ondelete='CASCADE'),
-                                        nullable=False)
+                                         nullable=False,
+                                         index=True)
 
     user: Mapped["User"] = relationship(back_populates="channels")
     posts: Mapped[list["Post"]] = relationship(back_populates="channel")
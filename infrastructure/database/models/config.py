@@ -5,6 +5,13 @@ from .base import Base, TimestampMixin
 
 
 class Config(Base, TimestampMixin):
+    """
+    Legacy: the comma-separated admin and subadmin id lists, replaced by the roles table.
+
+    Nothing reads or writes the table any more. It is kept only because
+    migration 5 copies the lists into the roles table, and it has no
+    repository.
+    """
     __tablename__ = 'config'
 
     id: Mapped[int] = mapped_column(primary_key=True)
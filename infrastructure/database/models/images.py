@@ -1,6 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, BigInteger
+from sqlalchemy import ForeignKey, BigInteger, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -22,6 +22,9 @@ class Image(Base, TimestampMixin):
 
     post: Mapped["Post"] = relationship(back_populates="images")
 
+    __table_args__ = (
+        Index("ix__images__post_id_id", "post_id", "id"),
+    )
     __mapper_args__ = {'eager_defaults': True}
 
     def __repr__(self) -> str:
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import func
+
+from .base import Base, TimestampMixin
+
+
+class OutboxMessage(Base, TimestampMixin):
+    """
+    An outgoing message waiting to be delivered.
+
+    `status` is "pending" until the message is delivered ("sent") or given up
+    on ("failed"). A worker claims a pending message by setting
+    `locked_until`; when the worker dies the lease expires and another worker
+    picks the message up again.
+    """
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(unique=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    payload: Mapped[dict] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(default="pending",
+                                        server_default="pending")
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    not_before: Mapped[datetime] = mapped_column(TIMESTAMP,
+                                                 server_default=func.now())
+    locked_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+    error: Mapped[Optional[str]]
+
+    __table_args__ = (
+        Index("ix__outbox__not_before", "not_before",
+              postgresql_where=text("status = 'pending'")),
+    )
+    __mapper_args__ = {'eager_defaults': True}
+
+    def __repr__(self) -> str:
+        return f"OutboxMessage: #{self.id}"
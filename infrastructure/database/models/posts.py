@@ -1,6 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, BigInteger
+from sqlalchemy import ForeignKey, BigInteger, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -21,16 +21,24 @@ class Post(Base, TimestampMixin):
     user_id: Mapped[int] = mapped_column(BigInteger,
                                          ForeignKey("users.user_id",
                                                     ondelete='CASCADE'),
-                                         nullable=False)
+                                         nullable=False,
+                                         index=True)
     channel_id: Mapped[int] = mapped_column(BigInteger,
                                             ForeignKey("channels.channel_id",
                                                        ondelete='CASCADE'),
                                             nullable=False)
+    position: Mapped[int]
 
     user: Mapped["User"] = relationship(back_populates="posts")
     channel: Mapped["Channel"] = relationship(back_populates="posts")
-    images: Mapped[list["Image"]] = relationship(back_populates="post")
-
+    images: Mapped[list["Image"]] = relationship(back_populates="post",
+                                                 order_by="Image.id")
+
+    __table_args__ = (
+        Index("ix__posts__channel_id_position", "channel_id", "position"),
+        # the post browser pages through the posts of a channel by id
+        Index("ix__posts__channel_id_id", "channel_id", "id"),
+    )
     __mapper_args__ = {'eager_defaults': True}
 
     def __repr__(self) -> str:
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+ADMIN = "admin"
+SUBADMIN = "subadmin"
+
+
+class Role(Base, TimestampMixin):
+    """
+    The role of a user: an admin, or a subadmin with everything but managing the subadmins.
+
+    An admin has every permission of a subadmin as well.
+    """
+    __tablename__ = "roles"
+
+    # no foreign key: admins come from the settings before they ever talk to the bot
+    user_id: Mapped[int] = mapped_column(BigInteger,
+                                         primary_key=True,
+                                         autoincrement=False)
+    role: Mapped[str] = mapped_column(index=True)
+
+    def __repr__(self) -> str:
+        return f"Role: #{self.user_id} {self.role}"
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class SchedulerShard(Base):
+    """
+    A share of the posting jobs: the channels with `abs(channel_id) % shards == shard`.
+
+    The worker process named in `owner` runs the jobs of the shard until
+    `lease_until`; it renews the lease while it is alive.
+    """
+    __tablename__ = "scheduler_shards"
+
+    shard: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    owner: Mapped[Optional[str]]
+    lease_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+
+    def __repr__(self) -> str:
+        return f"SchedulerShard: #{self.shard}"
+
+
+class SchedulerWorker(Base):
+    """
+    A live worker process taking part in the shard assignment.
+    """
+    __tablename__ = "scheduler_workers"
+
+    worker_id: Mapped[str] = mapped_column(primary_key=True)
+    heartbeat_at: Mapped[datetime] = mapped_column(TIMESTAMP)
+
+    def __repr__(self) -> str:
+        return f"SchedulerWorker: #{self.worker_id}"
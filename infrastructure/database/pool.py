@@ -0,0 +1,146 @@
+import bisect
+import logging
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+
+logger = logging.getLogger(__name__)
+
+# upper bounds, in seconds, of the checkout latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Counters of a connection pool since it was created.
+
+    Attributes:
+        checkouts (int): The number of connections handed out.
+        checkins (int): The number of connections given back.
+        connects (int): The number of new database connections opened.
+        timeouts (int): The number of checkouts that gave up waiting for a connection.
+        total_wait (float): The total checkout latency, in seconds.
+        max_wait (float): The longest checkout latency, in seconds.
+        latency (list[int]): Checkouts per `LATENCY_BUCKETS` bucket, the last one is for slower ones.
+    """
+
+    checkouts: int = 0
+    checkins: int = 0
+    connects: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    latency: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def observe(self, waited: float) -> None:
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.latency[bisect.bisect_left(LATENCY_BUCKETS, waited)] += 1
+
+
+@dataclass
+class PoolStats:
+    """
+    Snapshot of the connection pool metrics.
+
+    Attributes:
+        size (int): The number of connections the pool keeps open, 0 without pooling.
+        in_use (int): The number of connections currently checked out.
+        idle (int): The number of open connections waiting in the pool.
+        overflow (int): The number of connections opened above `size`.
+        metrics (PoolMetrics): The counters since the pool was created.
+    """
+
+    size: int
+    in_use: int
+    idle: int
+    overflow: int
+    metrics: PoolMetrics
+
+    @property
+    def average_wait(self) -> float:
+        checkouts = self.metrics.checkouts
+        return self.metrics.total_wait / checkouts if checkouts else 0.0
+
+    def histogram(self) -> dict[str, int]:
+        """Returns the checkout latency histogram with readable bucket names."""
+        names = [f"<{bound * 1000:g}ms" for bound in LATENCY_BUCKETS]
+        names.append(f">{LATENCY_BUCKETS[-1] * 1000:g}ms")
+        return dict(zip(names, self.metrics.latency))
+
+
+class InstrumentedPoolMixin:
+    """
+    Measures how long getting a connection from the pool takes.
+
+    The checkout, checkin and connect counters come from the pool events;
+    the latency covers the whole wait, including opening a new connection.
+    """
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "checkout", self._on_checkout)
+        event.listen(self, "checkin", self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.metrics.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.metrics.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.metrics.checkins += 1
+
+    def _do_get(self):
+        started_at = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            logger.warning("Timed out waiting for a database connection: %s", self.status())
+            raise
+        self.metrics.observe(time.monotonic() - started_at)
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(InstrumentedPoolMixin, NullPool):
+    pass
+
+
+def get_pool_stats(engine: AsyncEngine) -> PoolStats:
+    """
+    Returns the current metrics of the connection pool of the engine.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+
+    Returns:
+        PoolStats: The pool metrics.
+    """
+    pool: Pool = engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        return PoolStats(size=pool.size(),
+                         in_use=pool.checkedout(),
+                         idle=pool.checkedin(),
+                         overflow=max(pool.overflow(), 0),
+                         metrics=metrics)
+    return PoolStats(size=0,
+                     in_use=metrics.checkouts - metrics.checkins,
+                     idle=0,
+                     overflow=0,
+                     metrics=metrics)
@@ -2,12 +2,16 @@ from .base import BaseRepo
 from .users import UserRepo
 from .channels import ChannelRepo
 from .posts import PostRepo
-from .configs import ConfigRepo
+from .outbox import OutboxRepo
+from .shards import ShardRepo
+from .roles import RoleRepo
 
 __all__ = [
     "BaseRepo",
     "UserRepo",
     "ChannelRepo",
     "PostRepo",
-    "ConfigRepo"
+    "OutboxRepo",
+    "ShardRepo",
+    "RoleRepo",
 ]
@@ -1,21 +1,35 @@
 from sqlalchemy import select
+from sqlalchemy.sql.functions import func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+# session.info key: the owner of the session commits it once at the end,
+# the repositories only flush their changes
+UNIT_OF_WORK = "unit_of_work"
+# session.info key: the session wrote something, later reads must see it
+WROTE = "wrote"
+# the Postgres notification channel of the cache invalidation keys
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+
 class BaseRepo:
     """
     A class representing a base repository for handling database operations.
 
     Attributes:
         session (AsyncSession): The database session used by the repository.
+        read_session (AsyncSession): The session of the read-only methods that
+            tolerate replication lag, the primary session when there is no replica.
 
     """
 
     # todo - add type hints for the attribute
     model = None
 
-    def __init__(self, session):
+    def __init__(self, session, read_session=None):
         self.session: AsyncSession = session
+        self.read_session: AsyncSession = (read_session if read_session is not None
+                                           else session)
 
     async def get_or_none(self, **kwargs):
         """
@@ -29,5 +43,32 @@ class BaseRepo:
 
         """
         query = select(self.model).filter_by(**kwargs)
-        result = await self.session.execute(query)
+        result = await self.read_session.execute(query)
         return result.scalar_one_or_none()
+
+    async def commit(self) -> None:
+        """
+        Commits the changes of the repository method.
+
+        In a unit-of-work session the changes are only flushed, they are
+        committed together by the owner of the session.
+        """
+        self.session.info[WROTE] = True
+        if self.session.info.get(UNIT_OF_WORK):
+            await self.session.flush()
+        else:
+            await self.session.commit()
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Tells every process to drop what it cached under the keys.
+
+        The notifications are part of the transaction: they are delivered
+        when it commits and never if it rolls back.
+
+        Args:
+            *keys (str): Invalidation keys, like "roles" or "channel:42".
+        """
+        for key in keys:
+            await self.session.execute(
+                select(func.pg_notify(INVALIDATION_CHANNEL, key)))
@@ -1,12 +1,14 @@
 from typing import Optional
 from datetime import timedelta
 
-from sqlalchemy import select, update, ScalarResult
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import select, update, Row
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.functions import func
 
-from infrastructure.database.models import Channel, Post
+from infrastructure.database.models import Channel
 from infrastructure.database.repo.base import BaseRepo
+from infrastructure.database.repo.posts import PostRepo
+from infrastructure.database.repo.views import ChannelItem, ChannelSchedule
 
 
 class ChannelRepo(BaseRepo):
@@ -56,34 +58,108 @@ class ChannelRepo(BaseRepo):
         )
 
         result = await self.session.execute(insert_stmt)
-        await self.session.commit()
+        await self.commit()
         return result.scalar_one()
 
-    async def get_all_channels(self,
-                               user_id: int) -> ScalarResult[Channel]:
-        stmt = select(Channel).where(
-            Channel.user_id == user_id)
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
-
     async def get_channel(self, channel_id: int) -> Channel | None:
         stmt = select(Channel).where(Channel.channel_id == channel_id)
-        result = await self.session.execute(stmt)
+        result = await self.read_session.execute(stmt)
         return result.scalar()
 
-    async def get_channel_with_posts(self, channel_id: int) -> Channel | None:
-        stmt = select(Channel)\
-            .where(Channel.channel_id == channel_id)\
-            .options(selectinload(Channel.posts)\
-            .options(selectinload(Post.images)))
+    async def get_channel_items(self, user_id: int) -> list[ChannelItem]:
+        """
+        Returns the id and the name of every channel of the user.
+
+        Args:
+            user_id (int): The unique identifier of the user.
+
+        Returns:
+            list[ChannelItem]: The channels of the user.
+        """
+        stmt = select(Channel.channel_id, Channel.name).where(
+            Channel.user_id == user_id)
+        result = await self.read_session.execute(stmt)
+        return [ChannelItem(*row) for row in result]
+
+    @staticmethod
+    def _schedule_columns():
+        return (Channel.channel_id,
+                Channel.bot_is_on,
+                Channel.post_interval,
+                Channel.last_post_at,
+                Channel.name,
+                Channel.misfire_policy,
+                Channel.misfire_replay_limit)
+
+    async def get_channel_schedule(self, channel_id: int) -> ChannelSchedule | None:
+        """
+        Returns the posting settings of the channel.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+
+        Returns:
+            ChannelSchedule | None: The posting settings, None if there is no such channel.
+        """
+        stmt = select(*self._schedule_columns()).where(
+            Channel.channel_id == channel_id)
+        result = await self.read_session.execute(stmt)
+        row = result.first()
+        return ChannelSchedule(*row) if row else None
+
+    async def get_channel_with_post_count(
+            self, channel_id: int) -> tuple[ChannelSchedule, int] | None:
+        """
+        Returns the posting settings of the channel together with the number of its posts in one query.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+
+        Returns:
+            tuple[ChannelSchedule, int] | None: The posting settings and the
+                number of posts, None if there is no such channel.
+        """
+        stmt = select(*self._schedule_columns(),
+                      PostRepo.count_posts_subquery(Channel.channel_id)
+                      ).where(Channel.channel_id == channel_id)
+        result = await self.read_session.execute(stmt)
+        row = result.first()
+        if row is None:
+            return None
+        *schedule, posts = row
+        return ChannelSchedule(*schedule), posts
+
+    async def get_active_channels(self,
+                                  shards: int = 1,
+                                  owned: Optional[list[int]] = None) -> list[Row]:
+        """
+        Returns the posting schedule of every channel with the bot on.
+
+        Args:
+            shards (int): The number of scheduler shards.
+            owned (Optional[list[int]]): Only the channels of these shards, all if None.
+
+        Returns:
+            list[Row]: Rows with channel_id, post_interval, last_post_at,
+                misfire_policy and misfire_replay_limit.
+        """
+        stmt = select(Channel.channel_id,
+                      Channel.post_interval,
+                      Channel.last_post_at,
+                      Channel.misfire_policy,
+                      Channel.misfire_replay_limit).where(
+            Channel.bot_is_on == "on")
+        if owned is not None:
+            stmt = stmt.where(
+                (func.abs(Channel.channel_id) % shards).in_(owned))
         result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return result.all()
 
     async def get_bot_status(self,
                              channel_id: int) -> Channel.bot_is_on:
         stmt = select(Channel.bot_is_on).where(
             Channel.channel_id == channel_id)
-        result = await self.session.execute(stmt)
+        result = await self.read_session.execute(stmt)
         return result.scalar()
 
     async def update_bot_status(self,
@@ -92,7 +168,8 @@ class ChannelRepo(BaseRepo):
         stmt = update(Channel).where(
             Channel.channel_id == channel_id).values(bot_is_on=bot_is_on)
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.invalidate(f"channel:{channel_id}")
+        await self.commit()
         return
 
     async def update_channel_job(self,
@@ -101,7 +178,7 @@ class ChannelRepo(BaseRepo):
         stmt = update(Channel).where(
             Channel.channel_id == channel_id).values(channel_job=channel_job)
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
         return
 
     async def update_channel_post_interval(self,
@@ -110,5 +187,20 @@ class ChannelRepo(BaseRepo):
         stmt = update(Channel).where(
             Channel.channel_id == channel_id).values(post_interval=interval_timedelta)
         await self.session.execute(stmt)
-        await self.session.commit()
-        return
\ No newline at end of file
+        await self.invalidate(f"channel:{channel_id}")
+        await self.commit()
+        return
+
+    async def update_misfire_policy(self,
+                                    channel_id: int,
+                                    misfire_policy: str) -> None:
+        """
+        Sets the misfire policy of the channel, its replay limit stays as it is.
+        """
+        stmt = update(Channel).where(
+            Channel.channel_id == channel_id).values(
+                misfire_policy=misfire_policy)
+        await self.session.execute(stmt)
+        await self.invalidate(f"channel:{channel_id}")
+        await self.commit()
+        return
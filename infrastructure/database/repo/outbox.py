@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import BigInteger, delete, exists, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.sql.functions import func
+
+from infrastructure.database.models import Image, OutboxMessage, Post
+from infrastructure.database.repo.base import BaseRepo
+from infrastructure.database.repo.posts import PostRepo
+
+
+class OutboxRepo(BaseRepo):
+    model = OutboxMessage
+
+    async def enqueue(self, messages: list[dict]) -> int:
+        """
+        Adds outgoing messages, skipping the ones whose idempotency key is already known.
+
+        Args:
+            messages (list[dict]): Rows with `idempotency_key`, `chat_id` and `payload`.
+
+        Returns:
+            int: The number of added messages.
+        """
+        if not messages:
+            return 0
+        stmt = (
+            insert(OutboxMessage)
+            .values(messages)
+            .on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+            .returning(OutboxMessage.id)
+        )
+        result = await self.session.execute(stmt)
+        added = len(result.all())
+        await self.commit()
+        return added
+
+    async def enqueue_next_post(self,
+                                channel_id: int,
+                                idempotency_key: str,
+                                posted_at: datetime) -> bool:
+        """
+        Moves the channel cursor to its next post and adds that post to the outbox.
+
+        Both happen in one statement, so a post is never skipped or queued
+        twice: when the key is already in the outbox the cursor stays put.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+            idempotency_key (str): The key of this publication.
+            posted_at (datetime): The posting time, stored as the channel's last post time.
+
+        Returns:
+            bool: True if a post was queued.
+        """
+        already_queued = exists().where(
+            OutboxMessage.idempotency_key == idempotency_key)
+        advanced = PostRepo.next_post_cte(channel_id, posted_at, ~already_queued)
+
+        images = select(
+            func.jsonb_agg(aggregate_order_by(Image.image_id, Image.id))
+        ).where(Image.post_id == Post.id).scalar_subquery()
+        payload = func.jsonb_build_object(
+            "text", Post.text,
+            "images", func.coalesce(images, func.jsonb_build_array()))
+
+        stmt = (
+            insert(OutboxMessage)
+            .from_select(
+                ["idempotency_key", "chat_id", "payload"],
+                select(literal(idempotency_key),
+                       literal(channel_id, BigInteger),
+                       payload)
+                .select_from(Post)
+                .join(advanced, Post.id == advanced.c.id))
+            .on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+            .returning(OutboxMessage.id)
+        )
+        result = await self.session.execute(stmt)
+        queued = result.scalar() is not None
+        await self.commit()
+        return queued
+
+    async def claim_batch(self,
+                          limit: int,
+                          lease: timedelta) -> list[OutboxMessage]:
+        """
+        Locks a batch of due messages for this worker for the lease time.
+
+        `FOR UPDATE SKIP LOCKED` lets several workers and replicas claim
+        batches at the same time without waiting on or overlapping each other.
+
+        Args:
+            limit (int): The maximum number of messages to claim.
+            lease (timedelta): How long the messages stay claimed.
+
+        Returns:
+            list[OutboxMessage]: The claimed messages.
+        """
+        claimable = (
+            select(OutboxMessage.id)
+            .where(OutboxMessage.status == "pending",
+                   OutboxMessage.not_before <= func.now(),
+                   or_(OutboxMessage.locked_until.is_(None),
+                       OutboxMessage.locked_until < func.now()))
+            .order_by(OutboxMessage.not_before)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(claimable.scalar_subquery()))
+            .values(locked_until=func.now() + lease,
+                    attempts=OutboxMessage.attempts + 1)
+            .returning(OutboxMessage)
+        )
+        result = await self.session.execute(stmt)
+        messages = result.scalars().all()
+        await self.commit()
+        return messages
+
+    async def mark_sent(self, message_id: int) -> None:
+        stmt = update(OutboxMessage).where(
+            OutboxMessage.id == message_id).values(status="sent",
+                                                   sent_at=func.now(),
+                                                   locked_until=None)
+        await self.session.execute(stmt)
+        await self.commit()
+        return
+
+    async def mark_failed(self, message_id: int, error: str) -> None:
+        stmt = update(OutboxMessage).where(
+            OutboxMessage.id == message_id).values(status="failed",
+                                                   error=error,
+                                                   locked_until=None)
+        await self.session.execute(stmt)
+        await self.commit()
+        return
+
+    async def retry_later(self,
+                          message_id: int,
+                          delay: timedelta,
+                          error: str,
+                          count_attempt: bool = True) -> None:
+        """
+        Makes the message claimable again after the delay.
+
+        Args:
+            message_id (int): The unique identifier of the message.
+            delay (timedelta): The time until the next attempt.
+            error (str): Why the attempt failed.
+            count_attempt (bool): Whether the failed attempt counts against
+                the maximum, False gives back the attempt taken by the claim.
+        """
+        values = dict(not_before=func.now() + delay,
+                      error=error,
+                      locked_until=None)
+        if not count_attempt:
+            values["attempts"] = OutboxMessage.attempts - 1
+        stmt = update(OutboxMessage).where(
+            OutboxMessage.id == message_id).values(**values)
+        await self.session.execute(stmt)
+        await self.commit()
+        return
+
+    async def release(self, message_ids: list[int]) -> None:
+        """
+        Gives claimed but unsent messages back to the other workers.
+        """
+        stmt = update(OutboxMessage).where(
+            OutboxMessage.id.in_(message_ids),
+            OutboxMessage.status == "pending").values(locked_until=None)
+        await self.session.execute(stmt)
+        await self.commit()
+        return
+
+    async def purge_sent(self, older_than: timedelta) -> None:
+        stmt = delete(OutboxMessage).where(
+            OutboxMessage.status == "sent",
+            OutboxMessage.sent_at < func.now() - older_than)
+        await self.session.execute(stmt)
+        await self.commit()
+        return
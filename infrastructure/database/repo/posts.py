@@ -1,14 +1,17 @@
 import logging
 import os
+from datetime import datetime
 from typing import TYPE_CHECKING, Optional, Dict
 
-from sqlalchemy import delete, select, update, ScalarResult
-from sqlalchemy.orm import joinedload, selectinload
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import delete, func, select, update, Row
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 
-from infrastructure.database.models import Post, Image
+from infrastructure.database.models import Channel, Post, Image
 from infrastructure.database.repo.base import BaseRepo
+from infrastructure.database.repo.views import PostContent
 
+# the bind parameters asyncpg can send with one statement
+MAX_PARAMETERS = 32767
 
 
 class PostRepo(BaseRepo):
@@ -34,7 +37,8 @@ class PostRepo(BaseRepo):
 
         post = Post(user_id=user_id,
                     text=text,
-                    channel_id=channel_id)
+                    channel_id=channel_id,
+                    position=self._next_position(channel_id))
 
         if images_ids:
             for image_id in images_ids:
@@ -42,37 +46,202 @@ class PostRepo(BaseRepo):
                 post.images.append(image)
 
         self.session.add(post)
-        await self.session.commit()
-
-    async def get_all_posts(self,
-                            user_id: int) -> ScalarResult[Post]:
-        stmt = select(Post).where(
-            Post.user_id == user_id)
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
-
-    async def get_all_posts_with_images(self,
-                                        user_id: int) -> ScalarResult[Post]:
-        stmt = select(Post).where(
-            Post.user_id == user_id).options(selectinload(Post.images))
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        await self.commit()
+
+    async def add_posts(self,
+                        user_id: int,
+                        channel_id: int,
+                        posts: list[tuple[Optional[str], list[str]]]) -> list[int]:
+        """
+        Creates many posts of the channel with multi-row inserts.
+
+        The post ids are taken from the sequence up front, so the images are
+        inserted together without a round trip per post. Every INSERT carries
+        as many rows as fit into the parameter limit of asyncpg, usually one
+        for the posts and one for the images. The posts keep the given order
+        after the posts the channel already has.
+
+        Args:
+            user_id (int): The unique identifier of the user who created the posts.
+            channel_id (int): The unique identifier of the channel.
+            posts (list[tuple[Optional[str], list[str]]]): The text and the image
+                file ids of every post.
+
+        Returns:
+            list[int]: The ids of the new posts, in the given order.
+        """
+        if not posts:
+            return []
+
+        post_ids = (await self.session.scalars(
+            select(func.nextval(func.pg_get_serial_sequence("posts", "id")))
+            .select_from(func.generate_series(1, len(posts)))
+        )).all()
+        last_position = await self.session.scalar(
+            select(func.coalesce(func.max(Post.position), 0)).where(
+                Post.channel_id == channel_id))
+
+        await self._insert_rows(Post.__table__, [
+            {"id": post_id,
+             "text": text,
+             "user_id": user_id,
+             "channel_id": channel_id,
+             "position": last_position + number}
+            for number, (post_id, (text, _)) in enumerate(zip(post_ids, posts), start=1)
+        ])
+        images = [{"image_id": image_id, "post_id": post_id}
+                  for post_id, (_, images_ids) in zip(post_ids, posts)
+                  for image_id in images_ids]
+        await self._insert_rows(Image.__table__, images)
+        await self.commit()
+        return list(post_ids)
+
+    async def _insert_rows(self, table, rows: list[dict]) -> None:
+        """
+        Inserts the rows with multi-row INSERT ... VALUES statements below the parameter limit.
+        """
+        if not rows:
+            return
+        chunk_size = MAX_PARAMETERS // len(rows[0])
+        for start in range(0, len(rows), chunk_size):
+            await self.session.execute(
+                insert(table).values(rows[start:start + chunk_size]))
+
+    @staticmethod
+    def _next_position(channel_id: int):
+        return select(
+            func.coalesce(func.max(Post.position), 0) + 1
+        ).where(Post.channel_id == channel_id).scalar_subquery()
+
+    @staticmethod
+    def next_post_cte(channel_id: int, posted_at: datetime, *conditions):
+        """
+        Builds the CTE that picks the next post of the channel and moves the cursor past it.
+
+        The channel cursor (`channel_job`) holds the position of the next post
+        to publish. The first post at or after the cursor is picked, wrapping
+        around to the first post of the channel, and the cursor is advanced in
+        an `UPDATE ... RETURNING` that yields the id of the picked post.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+            posted_at (datetime): The posting time, stored as the channel's last post time.
+            *conditions: Extra conditions, the cursor is left alone when they fail.
+        """
+        cursor = select(Channel.channel_job).where(
+            Channel.channel_id == channel_id).scalar_subquery()
+        channel_posts = select(Post.id).where(
+            Post.channel_id == channel_id).order_by(
+            Post.position, Post.id).limit(1)
+        next_post_id = func.coalesce(
+            channel_posts.where(Post.position >= cursor).scalar_subquery(),
+            channel_posts.scalar_subquery())
+        next_post = select(Post.id, Post.position).where(
+            Post.id == next_post_id, *conditions).cte("next_post")
+
+        return (
+            update(Channel)
+            .where(Channel.channel_id == channel_id)
+            .values(channel_job=next_post.c.position + 1,
+                    last_post_at=posted_at)
+            .returning(next_post.c.id)
+            .cte("advanced")
+        )
+
+    async def count_posts(self, channel_id: int) -> int:
+        """
+        Returns the number of posts of the channel without loading them.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+
+        Returns:
+            int: The number of posts.
+        """
+        stmt = select(func.count()).select_from(Post).where(
+            Post.channel_id == channel_id)
+        return await self.read_session.scalar(stmt)
+
+    @staticmethod
+    def count_posts_subquery(channel_id_column):
+        """
+        Builds the scalar subquery counting the posts of the channel in the given column.
+        """
+        return select(func.count()).select_from(Post).where(
+            Post.channel_id == channel_id_column).scalar_subquery()
+
+    async def get_posts_page(self,
+                             channel_id: int,
+                             limit: int,
+                             after: Optional[int] = None,
+                             before: Optional[int] = None) -> tuple[list[Row], bool]:
+        """
+        Returns a page of the posts of the channel using keyset pagination.
+
+        The page starts right after the post `after` or ends right before the
+        post `before`, so every page costs one query reading at most
+        `limit + 1` rows whatever its depth.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+            limit (int): The number of posts on a page.
+            after (Optional[int]): The id of the last post of the previous page.
+            before (Optional[int]): The id of the first post of the next page.
+
+        Returns:
+            tuple[list[Row], bool]: Rows with id, text and images (the number of
+                images) ordered by id, and whether there are more posts in the
+                direction of the page.
+        """
+        images = select(func.count(Image.id)).where(
+            Image.post_id == Post.id).scalar_subquery()
+        stmt = select(Post.id, Post.text, images.label("images")).where(
+            Post.channel_id == channel_id)
+        if before is not None:
+            stmt = stmt.where(Post.id < before).order_by(Post.id.desc())
+        else:
+            if after is not None:
+                stmt = stmt.where(Post.id > after)
+            stmt = stmt.order_by(Post.id)
+
+        result = await self.read_session.execute(stmt.limit(limit + 1))
+        posts = result.all()
+        has_more = len(posts) > limit
+        posts = posts[:limit]
+        if before is not None:
+            posts.reverse()
+        return posts, has_more
 
     async def get_post(self, post_id: int) -> Post | None:
         stmt = select(Post).where(Post.id == post_id)
-        result = await self.session.execute(stmt)
+        result = await self.read_session.execute(stmt)
         return result.scalar()
 
-    async def get_post_with_images(self, post_id: int) -> Post | None:
-        stmt = select(Post).where(
-            Post.id == post_id).options(selectinload(Post.images))
-        result = await self.session.execute(stmt)
-        return result.scalars().first()
+    async def get_post_content(self, post_id: int) -> PostContent | None:
+        """
+        Returns the text and the image file ids of the post in one query.
+
+        Args:
+            post_id (int): The unique identifier of the post.
+
+        Returns:
+            PostContent | None: The content of the post, None if there is no such post.
+        """
+        image_ids = select(
+            func.array_agg(aggregate_order_by(Image.image_id, Image.id))
+        ).where(Image.post_id == Post.id).scalar_subquery()
+        stmt = select(Post.id, Post.user_id, Post.text, image_ids).where(
+            Post.id == post_id)
+        result = await self.read_session.execute(stmt)
+        row = result.first()
+        if row is None:
+            return None
+        return PostContent(id=row[0], user_id=row[1], text=row[2],
+                           image_ids=row[3] or [])
 
     async def delete_post(self, post_id: int) -> None:
-        post = await self.get_post_with_images(post_id)
-        if post:
-            stmt = delete(Post).where(Post.id == post_id)
-            await self.session.execute(stmt)
-            await self.session.commit()
-        return
\ No newline at end of file
+        # straight on the primary, the replica may not have the post yet
+        stmt = delete(Post).where(Post.id == post_id)
+        await self.session.execute(stmt)
+        await self.commit()
+        return
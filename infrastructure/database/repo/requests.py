@@ -1,11 +1,15 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import (UserRepo,
                ChannelRepo,
                PostRepo,
-               ConfigRepo)
+               OutboxRepo,
+               ShardRepo,
+               RoleRepo)
+from infrastructure.database.repo.base import UNIT_OF_WORK, WROTE
 from infrastructure.database.setup import create_engine
 
 
@@ -15,37 +19,145 @@ class RequestsRepo:
     Repository for handling database operations. This class holds all the repositories for the database models.
 
     You can add more repositories as properties to this class, so they will be easily accessible.
+
+    With a replica session the read-only repository methods go to the read
+    replica. Once the session wrote something, or when `read_your_writes`
+    is set, they read from the primary, so a handler always sees its own
+    changes.
     """
 
     session: AsyncSession
+    replica_session: Optional[AsyncSession] = None
+    read_your_writes: bool = False
 
     @property
-    def configs(self) -> ConfigRepo:
+    def read_session(self) -> AsyncSession:
         """
-        The Config repository sessions are required to manage user operations.
+        The session of the read-only repository methods.
         """
-        return ConfigRepo(self.session)
+        if (self.replica_session is None or self.read_your_writes
+                or self.session.info.get(WROTE)):
+            return self.session
+        return self.replica_session
 
     @property
     def users(self) -> UserRepo:
         """
         The User repository sessions are required to manage user operations.
         """
-        return UserRepo(self.session)
+        return UserRepo(self.session, self.read_session)
 
     @property
     def channels(self) -> ChannelRepo:
         """
         The Channel repository sessions are required to manage channel operations.
         """
-        return ChannelRepo(self.session)
+        return ChannelRepo(self.session, self.read_session)
 
     @property
     def posts(self) -> PostRepo:
         """
         The Post repository sessions are required to manage post operations.
         """
-        return PostRepo(self.session)
+        return PostRepo(self.session, self.read_session)
+
+    @property
+    def outbox(self) -> OutboxRepo:
+        """
+        The Outbox repository sessions are required to manage outgoing messages.
+        """
+        return OutboxRepo(self.session)
+
+    @property
+    def shards(self) -> ShardRepo:
+        """
+        The Shard repository sessions are required to manage the scheduler shard assignment.
+        """
+        return ShardRepo(self.session)
+
+    @property
+    def roles(self) -> RoleRepo:
+        """
+        The Role repository sessions are required to manage the admins and the subadmins.
+        """
+        return RoleRepo(self.session)
+
+    async def commit(self) -> None:
+        """
+        Commits everything done through the repositories so far.
+
+        Handlers running in a unit of work call it to make their changes
+        durable before the end of the update.
+        """
+        await self.session.commit()
+
+
+class LazyRequestsRepo(RequestsRepo):
+    """
+    RequestsRepo that opens its database session on first use.
+
+    Handlers that never touch the database do not create a session at all.
+    The owner closes the repository with `close` once it is done with it.
+
+    As a unit of work the repositories only flush their changes and the
+    owner commits them all at once, so a multi-step handler is atomic and
+    costs one commit.
+
+    The replica session is opened lazily from `replica_pool` as well.
+    """
+
+    def __init__(self,
+                 session_pool,
+                 unit_of_work: bool = False,
+                 replica_pool=None,
+                 read_your_writes: bool = False) -> None:
+        self.session_pool = session_pool
+        self.unit_of_work = unit_of_work
+        self.replica_pool = replica_pool
+        self.read_your_writes = read_your_writes
+        self._session: AsyncSession | None = None
+        self._replica_session: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self.session_pool()
+            self._session.info[UNIT_OF_WORK] = self.unit_of_work
+        return self._session
+
+    @property
+    def replica_session(self) -> AsyncSession | None:
+        if self.replica_pool is None:
+            return None
+        if self._replica_session is None:
+            self._replica_session = self.replica_pool()
+        return self._replica_session
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    @property
+    def wrote(self) -> bool:
+        """
+        Whether something was written through the repositories.
+        """
+        return self._session is not None and bool(self._session.info.get(WROTE))
+
+    async def close(self) -> None:
+        """
+        Closes the session if it was opened, returning its connection to the pool.
+
+        Changes that were not committed are rolled back.
+        """
+        try:
+            if self._replica_session is not None:
+                await self._replica_session.close()
+                self._replica_session = None
+        finally:
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
 
 
 if __name__ == "__main__":
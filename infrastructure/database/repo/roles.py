@@ -0,0 +1,74 @@
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from infrastructure.database.models import Role
+from infrastructure.database.repo.base import BaseRepo
+
+
+class RoleRepo(BaseRepo):
+    model = Role
+
+    async def get_roles(self) -> list[tuple[int, str]]:
+        """
+        Returns the role of every user that has one.
+
+        Returns:
+            list[tuple[int, str]]: Pairs of the user id and the role.
+        """
+        result = await self.session.execute(select(Role.user_id, Role.role))
+        return [tuple(row) for row in result]
+
+    async def set_role(self,
+                       user_id: int,
+                       role: str) -> None:
+        """
+        Gives the user the role, replacing the role the user had.
+
+        Args:
+            user_id (int): The unique identifier of the user.
+            role (str): The role, ADMIN or SUBADMIN.
+        """
+        stmt = (
+            insert(Role)
+            .values(user_id=user_id, role=role)
+            .on_conflict_do_update(index_elements=[Role.user_id],
+                                   set_=dict(role=role))
+        )
+        await self.session.execute(stmt)
+        await self.invalidate("roles")
+        await self.commit()
+        return
+
+    async def add_roles(self,
+                        user_ids: list[int],
+                        role: str) -> None:
+        """
+        Gives the role to the users that have no role yet.
+
+        Args:
+            user_ids (list[int]): The unique identifiers of the users.
+            role (str): The role, ADMIN or SUBADMIN.
+        """
+        if not user_ids:
+            return
+        stmt = (
+            insert(Role)
+            .values([{"user_id": user_id, "role": role} for user_id in user_ids])
+            .on_conflict_do_nothing(index_elements=[Role.user_id])
+        )
+        await self.session.execute(stmt)
+        await self.invalidate("roles")
+        await self.commit()
+        return
+
+    async def remove_role(self, user_id: int) -> None:
+        """
+        Takes the role away from the user.
+
+        Args:
+            user_id (int): The unique identifier of the user.
+        """
+        await self.session.execute(delete(Role).where(Role.user_id == user_id))
+        await self.invalidate("roles")
+        await self.commit()
+        return
@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.functions import func
+
+from infrastructure.database.models import SchedulerShard, SchedulerWorker
+from infrastructure.database.repo.base import BaseRepo
+
+
+class ShardRepo(BaseRepo):
+    model = SchedulerShard
+
+    async def ensure_shards(self, shards: int) -> None:
+        """
+        Makes the shard table hold exactly the shards 0 to `shards - 1`.
+
+        Args:
+            shards (int): The number of shards.
+        """
+        stmt = (
+            insert(SchedulerShard)
+            .values([{"shard": shard} for shard in range(shards)])
+            .on_conflict_do_nothing(index_elements=[SchedulerShard.shard])
+        )
+        await self.session.execute(stmt)
+        await self.session.execute(
+            delete(SchedulerShard).where(SchedulerShard.shard >= shards))
+        await self.commit()
+        return
+
+    async def heartbeat(self,
+                        worker_id: str,
+                        expire: timedelta) -> int:
+        """
+        Marks the worker as alive and forgets the workers that stopped doing so.
+
+        Args:
+            worker_id (str): The identifier of the worker process.
+            expire (timedelta): How long a silent worker is still counted as alive.
+
+        Returns:
+            int: The number of live workers, this one included.
+        """
+        stmt = (
+            insert(SchedulerWorker)
+            .values(worker_id=worker_id, heartbeat_at=func.now())
+            .on_conflict_do_update(index_elements=[SchedulerWorker.worker_id],
+                                   set_=dict(heartbeat_at=func.now()))
+        )
+        await self.session.execute(stmt)
+        await self.session.execute(
+            delete(SchedulerWorker).where(
+                SchedulerWorker.heartbeat_at < func.now() - expire))
+        workers = await self.session.scalar(
+            select(func.count()).select_from(SchedulerWorker))
+        await self.commit()
+        return workers
+
+    async def renew(self,
+                    worker_id: str,
+                    lease: timedelta) -> list[int]:
+        """
+        Extends the lease of every shard the worker owns.
+
+        Args:
+            worker_id (str): The identifier of the worker process.
+            lease (timedelta): The new lease time.
+
+        Returns:
+            list[int]: The shards owned by the worker.
+        """
+        stmt = (
+            update(SchedulerShard)
+            .where(SchedulerShard.owner == worker_id)
+            .values(lease_until=func.now() + lease)
+            .returning(SchedulerShard.shard)
+        )
+        result = await self.session.execute(stmt)
+        shards = result.scalars().all()
+        await self.commit()
+        return shards
+
+    async def claim(self,
+                    worker_id: str,
+                    limit: int,
+                    lease: timedelta) -> list[int]:
+        """
+        Takes up to `limit` shards that have no owner or whose lease expired.
+
+        Args:
+            worker_id (str): The identifier of the worker process.
+            limit (int): The maximum number of shards to take.
+            lease (timedelta): The lease time.
+
+        Returns:
+            list[int]: The taken shards.
+        """
+        free = (
+            select(SchedulerShard.shard)
+            .where(or_(SchedulerShard.owner.is_(None),
+                       SchedulerShard.lease_until < func.now()))
+            .order_by(SchedulerShard.shard)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(SchedulerShard)
+            .where(SchedulerShard.shard.in_(free.scalar_subquery()))
+            .values(owner=worker_id, lease_until=func.now() + lease)
+            .returning(SchedulerShard.shard)
+        )
+        result = await self.session.execute(stmt)
+        shards = result.scalars().all()
+        await self.commit()
+        return shards
+
+    async def release(self,
+                      worker_id: str,
+                      shards: list[int] | None = None) -> None:
+        """
+        Gives the shards of the worker back, all of them if `shards` is None.
+
+        Args:
+            worker_id (str): The identifier of the worker process.
+            shards (list[int] | None): The shards to give back.
+        """
+        stmt = update(SchedulerShard).where(
+            SchedulerShard.owner == worker_id).values(owner=None,
+                                                      lease_until=None)
+        if shards is not None:
+            stmt = stmt.where(SchedulerShard.shard.in_(shards))
+        await self.session.execute(stmt)
+        await self.commit()
+        return
+
+    async def leave(self, worker_id: str) -> None:
+        """
+        Gives all shards of the worker back and removes it from the live workers.
+
+        Args:
+            worker_id (str): The identifier of the worker process.
+        """
+        await self.release(worker_id)
+        await self.session.execute(
+            delete(SchedulerWorker).where(SchedulerWorker.worker_id == worker_id))
+        await self.commit()
+        return
@@ -45,11 +45,38 @@ class UserRepo(BaseRepo):
                 index_elements=[User.user_id],
                 set_=dict(
                     username=username,
+                    tg_first_name=tg_first_name,
+                    tg_last_name=tg_last_name,
+                    tg_username=tg_username,
                 ),
             )
             .returning(User)
         )
         result = await self.session.execute(insert_stmt)
 
-        await self.session.commit()
+        await self.commit()
         return result.scalar_one()
+
+    async def upsert_users(self, users: list[dict]) -> None:
+        """
+        Creates or updates several users with a single statement.
+
+        Args:
+            users (list[dict]): Rows with `user_id`, `username`, `tg_first_name`,
+                `tg_last_name` and `tg_username`, at most one per user.
+        """
+        if not users:
+            return
+        insert_stmt = insert(self.model).values(users)
+        insert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_=dict(
+                username=insert_stmt.excluded.username,
+                tg_first_name=insert_stmt.excluded.tg_first_name,
+                tg_last_name=insert_stmt.excluded.tg_last_name,
+                tg_username=insert_stmt.excluded.tg_username,
+            ),
+        )
+        await self.session.execute(insert_stmt)
+        await self.commit()
+        return
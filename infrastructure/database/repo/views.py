@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+# Read models of the menu queries: plain values selected column by column,
+# with none of the identity map and change tracking of the ORM entities.
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelItem:
+    """
+    A channel in the channel list of a subadmin.
+
+    Attributes:
+        channel_id (int): The unique identifier of the channel.
+        name (Optional[str]): The name of the channel.
+    """
+
+    channel_id: int
+    name: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelSchedule:
+    """
+    The posting settings of a channel.
+
+    Attributes:
+        channel_id (int): The unique identifier of the channel.
+        bot_is_on (Optional[str]): Whether the bot posts to the channel, "on" or "off".
+        post_interval (timedelta): The time between two posts.
+        last_post_at (Optional[datetime]): The anchor of the posting interval.
+        name (Optional[str]): The name of the channel.
+        misfire_policy (Optional[str]): The misfire policy of the channel, None for the default one.
+        misfire_replay_limit (Optional[int]): The replay limit of the channel, None for the default one.
+    """
+
+    channel_id: int
+    bot_is_on: Optional[str]
+    post_interval: timedelta
+    last_post_at: Optional[datetime]
+    name: Optional[str]
+    misfire_policy: Optional[str]
+    misfire_replay_limit: Optional[int]
+
+
+@dataclass(frozen=True, slots=True)
+class PostContent:
+    """
+    What is needed to send a post.
+
+    Attributes:
+        id (int): The unique identifier of the post.
+        user_id (int): The owner of the post.
+        text (Optional[str]): The text of the post.
+        image_ids (list[str]): The Telegram file ids of the images, in sending order.
+    """
+
+    id: int
+    user_id: int
+    text: Optional[str]
+    image_ids: list[str]
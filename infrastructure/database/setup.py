@@ -1,26 +1,92 @@
+from uuid import uuid4
+
 from sqlalchemy.ext.asyncio.engine import AsyncEngine
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
 
-from .models.base import Base
+from .migrations import migrate
+from .pool import InstrumentedNullPool, InstrumentedQueuePool
 from tgbot.config import DbConfig
 
 
-async def create_engine(db: DbConfig, echo: bool = False) -> AsyncEngine:
+async def create_engine(db: DbConfig,
+                        echo: bool = False,
+                        processes: int = 1,
+                        replica: bool = False) -> AsyncEngine:
+    """
+    Creates the database engine and brings the schema up to date.
+
+    The pool of every process gets its share of the connection budget of
+    the replica. Behind PgBouncer in transaction mode the bouncer does the
+    pooling, so the engine opens a connection per checkout and does not
+    cache prepared statements, which a server connection would not keep.
+
+    The engine of the read replica leaves the schema to the primary.
+
+    Args:
+        db (DbConfig): The database settings.
+        echo (bool): Log the SQL statements.
+        processes (int): The number of processes of the replica with an engine.
+        replica (bool): Connect to the read replica instead of the primary.
+
+    Returns:
+        AsyncEngine: The database engine.
+    """
+    if db.pgbouncer:
+        pool_options = dict(
+            poolclass=InstrumentedNullPool,
+            connect_args={
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                # unnamed statements can clash between the clients of one server connection
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            },
+        )
+    else:
+        pool_size, max_overflow = db.pool_limits(processes)
+        pool_options = dict(
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=db.pool_timeout,
+        )
+
+    if replica:
+        url = db.construct_sqlalchemy_url(host=db.replica_host, port=db.replica_port)
+    else:
+        url = db.construct_sqlalchemy_url()
     engine = create_async_engine(
-        db.construct_sqlalchemy_url(),
+        url,
         query_cache_size=1200,
-        pool_size=20,
-        max_overflow=200,
         future=True,
         echo=echo,
+        **pool_options,
     )
 
-    async with engine.begin() as conn:
-        # await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+    if not replica:
+        # a single query when the schema is up to date
+        await migrate(engine)
     return engine
 
 
+def create_direct_engine(db: DbConfig) -> AsyncEngine:
+    """
+    Creates an engine connected to Postgres itself, past PgBouncer.
+
+    Session-level advisory locks need one server session for their whole
+    life, which PgBouncer in transaction mode does not give. The engine uses
+    the host of the invalidation listener and is not pooled.
+
+    Args:
+        db (DbConfig): The database settings.
+
+    Returns:
+        AsyncEngine: The database engine.
+    """
+    url = db.construct_sqlalchemy_url(host=db.listen_host, port=db.listen_port)
+    return create_async_engine(url, poolclass=NullPool, future=True)
+
+
 def create_session_pool(engine: AsyncEngine):
     session_pool = async_sessionmaker(bind=engine, expire_on_commit=False)
     return session_pool
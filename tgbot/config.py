@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Literal, Optional
+from dataclasses import dataclass, field
+from typing import Literal, Optional, get_args
 
 from environs import Env
 
@@ -22,6 +22,28 @@ class DbConfig:
         The name of the database.
     port : int
         The port where the database server is listening.
+    max_connections : int
+        The connections one replica may open, split between its processes.
+    pool_size : Optional[int]
+        The connections a process keeps open, derived from max_connections when None.
+    max_overflow : Optional[int]
+        The connections a process opens above pool_size under load, derived when None.
+    pool_timeout : float
+        How long a query waits for a free connection, in seconds.
+    pgbouncer : bool
+        Connect through PgBouncer in transaction mode: no pooling and no prepared statements cache.
+    replica_host : Optional[str]
+        The host of the read replica, reads go to the primary when None.
+    replica_port : Optional[int]
+        The port of the read replica, the primary port when None.
+    read_your_writes_window : float
+        For how many seconds after a write the reads of the user go to the primary.
+        Shared between the processes only with the Redis FSM storage (USE_REDIS).
+    listen_host : Optional[str]
+        The host the cache invalidations are listened on and, behind PgBouncer,
+        the scheduler leader lock is taken on, the primary host when None.
+    listen_port : Optional[int]
+        The port the cache invalidations are listened on, the primary port when None.
     """
 
     host: str
@@ -29,6 +51,32 @@ class DbConfig:
     user: str
     database: str
     port: int = 5432
+    max_connections: int = 40
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_timeout: float = 30.0
+    pgbouncer: bool = False
+    replica_host: Optional[str] = None
+    replica_port: Optional[int] = None
+    read_your_writes_window: float = 5.0
+    listen_host: Optional[str] = None
+    listen_port: Optional[int] = None
+
+    def pool_limits(self, processes: int = 1) -> tuple[int, int]:
+        """
+        Returns the pool size and the overflow of one process of the replica.
+
+        Args:
+            processes (int): The number of processes with a database engine.
+
+        Returns:
+            tuple[int, int]: The pool size and the maximum overflow.
+        """
+        budget = max(self.max_connections // max(processes, 1), 2)
+        pool_size = self.pool_size if self.pool_size is not None else budget // 2
+        max_overflow = (self.max_overflow if self.max_overflow is not None
+                        else max(budget - pool_size, 0))
+        return pool_size, max_overflow
 
     # For SQLAlchemy
     def construct_sqlalchemy_url(self, driver="asyncpg", host=None, port=None) -> str:
@@ -52,6 +100,13 @@ class DbConfig:
         )
         return uri.render_as_string(hide_password=False)
 
+    def construct_listen_dsn(self) -> str:
+        """
+        Constructs and returns the asyncpg DSN of the connection listening for the cache invalidations.
+        """
+        url = self.construct_sqlalchemy_url(host=self.listen_host, port=self.listen_port)
+        return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
     @staticmethod
     def from_env(env: Env):
         """
@@ -62,7 +117,23 @@ class DbConfig:
         user = env.str("POSTGRES_USER")
         database = env.str("DB_NAME")
         port = env.int("POSTGRES_PORT", 5432)
-        return DbConfig(host=host, password=password, user=user, database=database, port=port)
+        max_connections = env.int("DB_MAX_CONNECTIONS", 40)
+        pool_size = env.int("DB_POOL_SIZE", None)
+        max_overflow = env.int("DB_MAX_OVERFLOW", None)
+        pool_timeout = env.float("DB_POOL_TIMEOUT", 30.0)
+        pgbouncer = env.bool("DB_PGBOUNCER", False)
+        replica_host = env.str("DB_REPLICA_HOST", None) or None
+        replica_port = env.int("DB_REPLICA_PORT", None)
+        read_your_writes_window = env.float("DB_READ_YOUR_WRITES_WINDOW", 5.0)
+        listen_host = env.str("DB_LISTEN_HOST", None) or None
+        listen_port = env.int("DB_LISTEN_PORT", None)
+        return DbConfig(host=host, password=password, user=user, database=database, port=port,
+                        max_connections=max_connections, pool_size=pool_size,
+                        max_overflow=max_overflow, pool_timeout=pool_timeout,
+                        pgbouncer=pgbouncer, replica_host=replica_host,
+                        replica_port=replica_port,
+                        read_your_writes_window=read_your_writes_window,
+                        listen_host=listen_host, listen_port=listen_port)
 
 
 @dataclass
@@ -73,9 +144,9 @@ class TgBot:
 
     token: str
     bot_name: str
+    # the first admins, stored as the admins when the database has none
     admin_ids: list[int]
     use_redis: bool
-    subadmins_ids: Optional[list[int]] = None
 
     @staticmethod
     def from_env(env: Env):
@@ -129,6 +200,125 @@ class RedisConfig:
         return RedisConfig(redis_pass=redis_pass, redis_port=redis_port, redis_host=redis_host)
 
 
+@dataclass
+class WebhookConfig:
+    """
+    Webhook configuration class.
+
+    Attributes
+    ----------
+    enabled : bool
+        Receive updates through the webhook instead of long polling.
+    url : Optional[str]
+        The public base url Telegram sends the updates to, e.g. https://example.com.
+    path : str
+        The path of the webhook handler.
+    host : str
+        The host the webhook server listens on.
+    port : int
+        The port the webhook server listens on.
+    secret : Optional[str]
+        The secret token Telegram sends with every update.
+    workers : int
+        The number of processes serving the webhook on the same port.
+        More than one needs the Redis FSM storage.
+    """
+
+    enabled: bool = False
+    url: Optional[str] = None
+    path: str = "/webhook"
+    host: str = "0.0.0.0"
+    port: int = 8080
+    secret: Optional[str] = None
+    workers: int = 1
+
+    @property
+    def full_url(self) -> str:
+        return f"{self.url.rstrip('/')}{self.path}"
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the WebhookConfig object from environment variables.
+        """
+        enabled = env.bool("USE_WEBHOOK", False)
+        url = env.str("WEBHOOK_URL", None) or None
+        path = env.str("WEBHOOK_PATH", "/webhook")
+        host = env.str("WEBHOOK_HOST", "0.0.0.0")
+        port = env.int("WEBHOOK_PORT", 8080)
+        secret = env.str("WEBHOOK_SECRET", None) or None
+        workers = max(env.int("WEBHOOK_WORKERS", 1), 1)
+        return WebhookConfig(enabled=enabled, url=url, path=path, host=host,
+                             port=port, secret=secret, workers=workers)
+
+
+# what to do with the posting times a channel missed while the bot was down
+MisfirePolicy = Literal["skip", "coalesce", "replay"]
+
+
+@dataclass
+class SchedulerConfig:
+    """
+    Posting scheduler configuration class.
+
+    Attributes
+    ----------
+    jitter : int
+        The upper bound, in seconds, of the fixed per-channel posting delay that
+        spreads channels with the same posting time. 0 disables it.
+    misfire_policy : str
+        What to do with the posting times missed during downtime, for channels
+        without their own policy: "skip", "coalesce" or "replay".
+    misfire_replay_limit : int
+        The maximum number of missed posts to publish with the "replay" policy.
+    catchup_window : int
+        The number of seconds the catch-up posts after downtime are spread over.
+    election_interval : int
+        Seconds between the attempts of a replica to become the scheduler leader.
+    sync_interval : int
+        Seconds between syncs of the leader's posting jobs with the database.
+    shards : int
+        The number of shards the channels are split into. 1 runs all posting
+        jobs on the elected leader, more splits them between the worker processes.
+    workers : int
+        The number of extra scheduler worker processes started by the bot.
+    """
+
+    jitter: int = 60
+    misfire_policy: MisfirePolicy = "coalesce"
+    misfire_replay_limit: int = 3
+    catchup_window: int = 300
+    election_interval: int = 5
+    sync_interval: int = 30
+    shards: int = 1
+    workers: int = 0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the SchedulerConfig object from environment variables.
+        """
+        jitter = min(max(env.int("POSTING_JITTER", 60), 0), 3600)
+        misfire_policy = env.str("MISFIRE_POLICY", "coalesce")
+        if misfire_policy not in get_args(MisfirePolicy):
+            raise ValueError(f"MISFIRE_POLICY must be one of {', '.join(get_args(MisfirePolicy))}, "
+                             f"got {misfire_policy!r}")
+        misfire_replay_limit = env.int("MISFIRE_REPLAY_LIMIT", 3)
+        catchup_window = env.int("CATCHUP_WINDOW", 300)
+        election_interval = max(env.int("LEADER_ELECTION_INTERVAL", 5), 1)
+        sync_interval = env.int("SCHEDULER_SYNC_INTERVAL", 30)
+        shards = max(env.int("SCHEDULER_SHARDS", 1), 1)
+        workers = max(env.int("SCHEDULER_WORKERS", 0), 0)
+        return SchedulerConfig(jitter=jitter,
+                               misfire_policy=misfire_policy,
+                               misfire_replay_limit=misfire_replay_limit,
+                               catchup_window=catchup_window,
+                               election_interval=election_interval,
+                               sync_interval=sync_interval,
+                               shards=shards,
+                               workers=workers)
+
+
 @dataclass
 class Miscellaneous:
     """
@@ -168,6 +358,10 @@ class Config:
         Holds the settings related to the Telegram Bot.
     misc : Miscellaneous
         Holds the values for miscellaneous settings.
+    scheduler : SchedulerConfig
+        Holds the settings of the posting scheduler.
+    webhook : WebhookConfig
+        Holds the settings of the webhook mode.
     db : Optional[DbConfig]
         Holds the settings specific to the database (default is None).
     redis : Optional[RedisConfig]
@@ -177,9 +371,17 @@ class Config:
     tg_bot: TgBot
     misc: Miscellaneous
     environment: Literal["dev", "prod"]
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    webhook: WebhookConfig = field(default_factory=WebhookConfig)
     db: Optional[DbConfig] = None
     redis: Optional[RedisConfig] = None
 
+    @property
+    def processes(self) -> int:
+        """The number of processes of one replica: update handlers and scheduler workers."""
+        return self.scheduler.workers + (
+            self.webhook.workers if self.webhook.enabled else 1)
+
 
 def load_config(path: str | None = None) -> Config:
     """
@@ -198,6 +400,8 @@ def load_config(path: str | None = None) -> Config:
         tg_bot=TgBot.from_env(env),
         db=DbConfig.from_env(env),
         misc=Miscellaneous.from_env(env),
+        scheduler=SchedulerConfig.from_env(env),
+        webhook=WebhookConfig.from_env(env),
         environment=env.str("ENVIRONMENT", "dev"),
         # redis=RedisConfig.from_env(env),
     )
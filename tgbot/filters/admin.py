@@ -3,7 +3,7 @@ import logging
 from aiogram.filters import BaseFilter
 from aiogram.types import Message, CallbackQuery
 
-from tgbot.config import Config
+from tgbot.services.roles import RoleRegistry
 
 
 class AdminFilter(BaseFilter):
@@ -11,11 +11,11 @@ class AdminFilter(BaseFilter):
     def __init__(self, is_admin: bool = True) -> None:
         self.is_admin = is_admin
 
-    async def __call__(self, obj: Message, config: Config) -> bool:
+    async def __call__(self, obj: Message, roles: RoleRegistry) -> bool:
         # if isinstance(obj, CallbackQuery):
-        #     return (obj.message.chat.id in config.tg_bot.admin_ids) == self.is_admin
+        #     return roles.is_admin(obj.message.chat.id) == self.is_admin
         # else:
-        return (obj.chat.id in config.tg_bot.admin_ids) == self.is_admin
+        return roles.is_admin(obj.chat.id) == self.is_admin
 
 
 class AdminReply(BaseFilter):
@@ -24,6 +24,6 @@ class AdminReply(BaseFilter):
         self.is_admin = is_admin
         self.is_reply = is_reply
 
-    async def __call__(self, message: Message, config: Config) -> bool:
-        return ((message.chat.id in config.tg_bot.admin_ids) == self.is_admin
-                and message.reply_to_message)
\ No newline at end of file
+    async def __call__(self, message: Message, roles: RoleRegistry) -> bool:
+        return (roles.is_admin(message.chat.id) == self.is_admin
+                and message.reply_to_message)
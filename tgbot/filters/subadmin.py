@@ -2,7 +2,7 @@ import logging
 from aiogram.filters import BaseFilter
 from aiogram.types import Message, CallbackQuery
 
-from tgbot.config import Config
+from tgbot.services.roles import RoleRegistry
 
 
 class SubAdminFilter(BaseFilter):
@@ -10,8 +10,8 @@ class SubAdminFilter(BaseFilter):
     def __init__(self, is_subadmin: bool = True) -> None:
         self.is_subadmin = is_subadmin
 
-    async def __call__(self, obj: Message | CallbackQuery, config: Config) -> bool:
+    async def __call__(self, obj: Message | CallbackQuery, roles: RoleRegistry) -> bool:
         if isinstance(obj, CallbackQuery):
-            return config.tg_bot.subadmins_ids and (obj.message.chat.id in config.tg_bot.subadmins_ids) == self.is_subadmin
+            return roles.is_subadmin(obj.message.chat.id) == self.is_subadmin
         else:
-            return config.tg_bot.subadmins_ids and (obj.chat.id in config.tg_bot.subadmins_ids) == self.is_subadmin
+            return roles.is_subadmin(obj.chat.id) == self.is_subadmin
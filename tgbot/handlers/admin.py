@@ -6,12 +6,16 @@ from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.markdown import hbold, hitalic
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from infrastructure.database.pool import get_pool_stats
+from infrastructure.database.models.roles import SUBADMIN
 from infrastructure.database.repo.requests import RequestsRepo
 from tgbot.keyboards.admin import get_back_keyboard
+from tgbot.middlewares.rate_limit import get_rate_limiter
 from tgbot.filters.admin import AdminFilter, AdminReply
-from tgbot.config import Config
 from tgbot.helpers.message_text import get_messages_text
+from tgbot.services.roles import RoleRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -23,11 +27,9 @@ admin_router.callback_query.filter(F.message.chat.type == "private")
 
 @admin_router.message(Command(commands=["del_admin"]))
 async def delete_admin(message: Message,
-                       # repo: RequestsRepo,
-                       config: Config) -> None:
-    config.tg_bot.admin_ids.remove(message.from_user.id)
-    config.tg_bot.subadmins_ids.remove(message.from_user.id)
-    # await repo.update_admin_ids(config.tg_bot.admin_ids)
+                       repo: RequestsRepo,
+                       roles: RoleRegistry) -> None:
+    await roles.revoke(repo, message.from_user.id)
 
     text = "Администратор удален"
     await message.answer(text)
@@ -35,8 +37,8 @@ async def delete_admin(message: Message,
 
 @admin_router.message(Command(commands=["subadmins"]))
 async def get_all_subadmins(message: Message,
-                            config: Config) -> None:
-    subadmins = config.tg_bot.subadmins_ids
+                            roles: RoleRegistry) -> None:
+    subadmins = sorted(roles.subadmins)
     text = "Суб-администраторы:\n"
     for subadmin in subadmins:
         text += f"{subadmin}\n"
@@ -45,7 +47,7 @@ async def get_all_subadmins(message: Message,
 
 @admin_router.message(Command(commands=['add_subadmin']))
 async def add_subadmin(message: Message,
-                       config: Config,
+                       roles: RoleRegistry,
                        repo: RequestsRepo,
                        bot: Bot,
                        state: FSMContext,
@@ -60,12 +62,8 @@ async def add_subadmin(message: Message,
 
     sub_admin_id = int(arguments)
 
-    if not config.tg_bot.subadmins_ids:
-        config.tg_bot.subadmins_ids = []
-
-    if not sub_admin_id in config.tg_bot.subadmins_ids:
-        config.tg_bot.subadmins_ids.append(sub_admin_id)
-        await repo.configs.update_subadmin_ids(config.tg_bot.subadmins_ids)
+    if not roles.is_subadmin(sub_admin_id):
+        await roles.grant(repo, sub_admin_id, SUBADMIN)
         await message.answer(text=get_messages_text("ADD_SUBADMIN"))
         await bot.send_message(sub_admin_id,
                                get_messages_text("YOU_SUBADMIN"),
@@ -78,7 +76,7 @@ async def add_subadmin(message: Message,
 
 @admin_router.message(Command(commands=["del_subadmin"]))
 async def delete_admin(message: Message,
-                       config: Config,
+                       roles: RoleRegistry,
                        repo: RequestsRepo,
                        bot: Bot,
                        state: FSMContext,
@@ -93,17 +91,59 @@ async def delete_admin(message: Message,
 
     sub_admin_id = int(arguments)
 
-    if not sub_admin_id in config.tg_bot.subadmins_ids:
+    # an admin is removed with /del_admin only
+    if not roles.is_subadmin(sub_admin_id) or roles.is_admin(sub_admin_id):
         await message.answer(
             f"⚠️  Суб-администратора с таким ID: {sub_admin_id} не существует!")
         return
 
-    config.tg_bot.subadmins_ids.remove(sub_admin_id)
-    await repo.configs.update_subadmin_ids(config.tg_bot.subadmins_ids)
+    await roles.revoke(repo, sub_admin_id)
     await message.answer(
         f"✅  Суб-администратор с ID: {sub_admin_id} удален!")
 
 
+@admin_router.message(Command(commands=["dbstats"]))
+async def get_db_stats(message: Message,
+                       engine: AsyncEngine) -> None:
+    stats = get_pool_stats(engine)
+    metrics = stats.metrics
+    histogram = "\n".join(f"    {bucket}: {count}"
+                          for bucket, count in stats.histogram().items())
+    text = f'''{hbold("Пул соединений с базой данных")} (этот процесс)
+Размер: {stats.size}
+Заняты: {stats.in_use}
+Свободны: {stats.idle}
+Сверх размера: {stats.overflow}
+
+Выдано: {metrics.checkouts}
+Открыто соединений: {metrics.connects}
+Таймауты ожидания: {metrics.timeouts}
+Среднее ожидание: {stats.average_wait * 1000:.1f} мс
+Максимальное ожидание: {metrics.max_wait * 1000:.1f} мс
+
+Ожидание соединения:
+{histogram}'''
+    await message.answer(text)
+
+
+@admin_router.message(Command(commands=["ratestats"]))
+async def get_rate_stats(message: Message, bot: Bot) -> None:
+    limiter = get_rate_limiter(bot)
+    if limiter is None:
+        await message.answer("Ограничитель частоты отправки не подключен.")
+        return
+    stats = limiter.stats()
+    text = f'''{hbold("Ограничитель частоты отправки")} (этот процесс)
+В очереди: {stats.waiting}
+Отправлено: {stats.sent}
+Ждали отправки: {stats.delayed}
+Среднее ожидание: {stats.average_wait * 1000:.1f} мс
+Максимальное ожидание: {stats.max_wait * 1000:.1f} мс
+Ошибки flood control: {stats.flood_waits}
+Отслеживаемых чатов: {stats.buckets}'''
+    await message.answer(text)
+
+
 @admin_router.message(Command(commands=['help']))
 async def get_help(message: Message, state: FSMContext) -> None:
     await state.clear()
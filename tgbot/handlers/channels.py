@@ -7,7 +7,7 @@ from aiogram.filters.chat_member_updated import (
 )
 
 from infrastructure.database.repo.requests import RequestsRepo
-from tgbot.config import Config
+from tgbot.services.roles import RoleRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +29,10 @@ async def ask_id(message: Message) -> None:
     )
 )
 async def join_to_chat(event: ChatMemberUpdated,
-                       config: Config,
+                       roles: RoleRegistry,
                        repo: RequestsRepo,
                        bot: Bot):
-    if ((not event.from_user.id in config.tg_bot.admin_ids)
-            and (not event.from_user.id in config.tg_bot.subadmins_ids)):
+    if not roles.is_subadmin(event.from_user.id):
         await bot.leave_chat(event.chat.id)
 
     await repo.channels.get_or_create_channel(
@@ -1,22 +1,26 @@
 import logging
 import re
+import tempfile
 from datetime import timedelta
+from html import escape as quote
+from textwrap import shorten
 
 from aiogram import F, Router, Bot
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramAPIError
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.markdown import hbold, hitalic
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.base import JobLookupError
-from apscheduler.triggers.cron import CronTrigger
-
 from infrastructure.database.repo.requests import RequestsRepo
 from tgbot.filters.subadmin import SubAdminFilter
 from tgbot.helpers.message_text import get_messages_text
 from tgbot.helpers.utils import create_absolute_path
-from tgbot.services.scheduler import send_message_interval
+from tgbot.services.scheduler import MISFIRE_POLICIES, PostingScheduler
+from tgbot.services.outbox import send_post
+from tgbot.services.post_import import ImportReport, import_posts, read_posts
+from tgbot.services.roles import RoleRegistry
+from tgbot.middlewares.album import AlbumMiddleware
 from tgbot.config import Config
 from tgbot.misc.states import (AddPostState,
                                AddPostIntervalState,)
@@ -26,33 +30,43 @@ from tgbot.keyboards.admin import (get_back_keyboard,
                                    get_selected_channel_keyboard,
                                    get_posts_keyboard,
                                    get_all_posts_keyboard,
-                                   get_back_to_channel_keyboard)
+                                   get_posts_page_keyboard,
+                                   get_back_to_channel_keyboard,
+                                   get_scheduling_keyboard)
 from tgbot.handlers import admin_router
 
 logger = logging.getLogger(__name__)
 
+# posts on a page of the post browser
+POSTS_PAGE_SIZE = 5
+# the largest file the Bot API lets a bot download
+MAX_IMPORT_SIZE = 20 * 1024 * 1024
+# skipped rows listed in the import report
+IMPORT_ERRORS_SHOWN = 20
+
 subadmin_router = Router()
 subadmin_router.message.filter(SubAdminFilter())
 subadmin_router.callback_query.filter(SubAdminFilter())
 subadmin_router.message.filter(F.chat.type == "private")
 subadmin_router.callback_query.filter(F.message.chat.type == "private")
+subadmin_router.message.middleware(AlbumMiddleware())
 
 
 @subadmin_router.message(CommandStart())
 @subadmin_router.callback_query(F.data == 'main_menu')
 async def process_start_command(obj: Message | CallbackQuery,
-                                config: Config,
+                                roles: RoleRegistry,
                                 state: FSMContext) -> None:
     await state.clear()
 
     if isinstance(obj, CallbackQuery):
         await obj.answer()
-        is_admin = obj.message.chat.id in config.tg_bot.admin_ids
+        is_admin = roles.is_admin(obj.message.chat.id)
         await obj.message.edit_text(
             text=get_messages_text("MENU"),
             reply_markup=await get_main_keyboard(is_admin))
     else:
-        is_admin = obj.chat.id in config.tg_bot.admin_ids
+        is_admin = roles.is_admin(obj.chat.id)
         await obj.answer(text=get_messages_text("MENU"),
                          reply_markup=await get_main_keyboard(is_admin))
 
@@ -66,7 +80,7 @@ async def get_my_channels(call: CallbackQuery,
 
     my_channels = []
     text_key = "NO_CHANNELS"
-    channels = await repo.channels.get_all_channels(
+    channels = await repo.channels.get_channel_items(
                                         user_id=call.message.chat.id)
     if channels:
         text_key = "MY_CHANNELS"
@@ -83,7 +97,7 @@ async def get_my_channels(call: CallbackQuery,
 @subadmin_router.callback_query(F.data.startswith('channel_*_'))
 async def get_selected_channel(call: CallbackQuery,
                                repo: RequestsRepo,
-                               scheduler: AsyncIOScheduler,
+                               scheduler: PostingScheduler,
                                state: FSMContext,
                                bot: Bot) -> None:
     await state.clear()
@@ -98,9 +112,9 @@ async def get_selected_channel(call: CallbackQuery,
     })
 
     if bot_is_on != "prof":
-        channel = await repo.channels.get_channel_with_posts(channel_id)
+        channel, posts = await repo.channels.get_channel_with_post_count(channel_id)
 
-        if len(channel.posts) <= 0:
+        if posts <= 0:
             await call.answer(
                 text="⚠️  Добавьте посты, чтобы включить бота на канале!",
                 show_alert=True)
@@ -112,40 +126,11 @@ async def get_selected_channel(call: CallbackQuery,
 
             await repo.channels.update_channel_job(channel_id=channel_id,
                                                    channel_job=1)
-
-            total_seconds = channel.post_interval.total_seconds()
-            days, hours = divmod(total_seconds, 24 * 3600)
-            hours, remainder = divmod(hours, 3600)
-            minutes, seconds = divmod(remainder, 60)
-
-            job = scheduler.get_job(f'{channel_id}')
-            if job:
-                scheduler.remove_job(f'{channel_id}')
-                logging.info(f"JOB REMOVED: {job}")
-
-            trigger = CronTrigger(
-                year="*",
-                month="*",
-                day=int(days) if days else "*",
-                hour=int(hours) if hours else 0,
-                minute=int(minutes) if minutes else 0,
-                second=0
-                )
-            scheduler.add_job(send_message_interval,
-                              trigger=trigger,
-                              id=f'{channel_id}',
-                              kwargs={
-                                  "chat_id": channel_id,
-                                  "bot": bot,
-                                  "repo": repo,
-                                  })
-            logging.info("JOB ADDED")
+            scheduler.schedule(channel_id,
+                               channel.post_interval,
+                               channel.last_post_at)
         elif bot_is_on == "off":
-            try:
-                scheduler.remove_job(f'{channel_id}')
-                logging.info("JOB REMOVED")
-            except JobLookupError:
-                logging.info(f"NO JOB BY THE ID OF {channel_id} WAS FOUND")
+            scheduler.unschedule(channel_id)
 
         await repo.channels.update_bot_status(channel_id, bot_is_on)
     else:
@@ -167,8 +152,8 @@ async def get_my_posts(call: CallbackQuery,
     state_data = await state.get_data()
     channel_id = state_data["channel_id"]
     channel = state_data["channel"]
-    posts = await repo.posts.get_all_posts(user_id=call.message.chat.id)
-    text = f"Количество постов для канала: {len(posts)}"
+    posts = await repo.posts.count_posts(channel_id)
+    text = f"Количество постов для канала: {posts}"
     if not posts:
         text = get_messages_text("NO_POSTS")
 
@@ -178,7 +163,16 @@ async def get_my_posts(call: CallbackQuery,
                                      channel=channel))
 
 
+def get_post_preview(post) -> str:
+    images = f"  🖼 {post.images}" if post.images else ""
+    text = (quote(shorten(post.text, 200, placeholder="…"))
+            if post.text else "Нет текста. Только изображение.")
+    return (f"ID: {post.id}{images}\nТекст: {text}\n"
+            f"Показать /showpost_{post.id}  Удалить /delpost_{post.id}")
+
+
 @subadmin_router.callback_query(F.data == 'show_posts')
+@subadmin_router.callback_query(F.data.startswith('posts_'))
 async def show_all_posts(call: CallbackQuery,
                          repo: RequestsRepo,
                          state: FSMContext) -> None:
@@ -187,33 +181,48 @@ async def show_all_posts(call: CallbackQuery,
     channel_id = state_data["channel_id"]
     channel = state_data["channel"]
 
-    posts = await repo.posts.get_all_posts_with_images(
-                                    user_id=call.message.chat.id)
-    if posts:
-        for post in posts:
-            if post.images:
-                post_text=f"""ID: {post.id}\nУдалить пост /delpost_{post.id}\
-                    \nТекст: {post.text
-                              if post.text
-                              else 'Нет текста. Только изображение.'}"""
-
-                await call.message.answer_photo(post.images[0].image_id,
-                                                caption=post_text)
-            else:
-                post_text = f"""ID: {post.id}\nУдалить пост /delpost_{post.id}
-                    \nТекст: {post.text}"""
-                await call.message.answer(text=post_text)
-
-        await call.message.answer(
-            text=f"{get_messages_text('YOUR_POSTS')}{len(posts)}",
+    after = before = None
+    if call.data.startswith('posts_'):
+        _, direction, cursor = call.data.split("_")
+        if direction == "next":
+            after = int(cursor)
+        else:
+            before = int(cursor)
+
+    posts, has_more = await repo.posts.get_posts_page(channel_id,
+                                                      POSTS_PAGE_SIZE,
+                                                      after=after,
+                                                      before=before)
+    if not posts:
+        await call.message.edit_text(
+            text=get_messages_text("NO_POSTS"),
             reply_markup=await get_all_posts_keyboard(channel_id=channel_id,
                                                       channel=channel))
         return
 
+    posts_text = "\n\n".join(get_post_preview(post) for post in posts)
     await call.message.edit_text(
-        text=get_messages_text("NO_POSTS"),
-        reply_markup=await get_all_posts_keyboard(channel_id=channel_id,
-                                                  channel=channel))
+        text=f"{get_messages_text('POSTS_PAGE')}\n\n{posts_text}",
+        reply_markup=await get_posts_page_keyboard(
+            channel_id=channel_id,
+            channel=channel,
+            first_id=posts[0].id,
+            last_id=posts[-1].id,
+            has_prev=has_more if before is not None else after is not None,
+            has_next=has_more if before is None else True))
+
+
+@subadmin_router.message(F.text.startswith('/showpost_'))
+async def show_post(message: Message,
+                    repo: RequestsRepo,
+                    bot: Bot) -> None:
+    post_id = int(message.text.split("_")[1])
+    post = await repo.posts.get_post_content(post_id)
+    if not post or post.user_id != message.chat.id:
+        await message.answer(text=get_messages_text("POST_NOT_FOUND"))
+        return
+
+    await send_post(bot, message.chat.id, post.text, post.image_ids)
 
 
 @subadmin_router.callback_query(F.data == 'add_posts')
@@ -236,18 +245,21 @@ async def add_new_posts(call: CallbackQuery,
 async def save_post(message: Message,
                     repo: RequestsRepo,
                     state: FSMContext,
-                    bot: Bot) -> None:
+                    bot: Bot,
+                    album: list[Message] | None = None) -> None:
     if not message.text and not message.photo:
         await message.answer(get_messages_text("POST_ERROR"))
         return
 
-    # Getting post info from message
+    # Getting post info from message, an album becomes a single post
     images_ids = None
 
     if message.photo:
-        post_text = message.caption
-        file_id = message.photo[-1].file_id
-        images_ids = [file_id]
+        messages = album or [message]
+        images_ids = [item.photo[-1].file_id
+                      for item in messages if item.photo]
+        post_text = next((item.caption for item in messages if item.caption),
+                         None)
     else:
         post_text = message.text
 
@@ -266,6 +278,83 @@ async def save_post(message: Message,
             channel_name=channel_name))
 
 
+@subadmin_router.callback_query(F.data == 'import_posts')
+async def ask_posts_import(call: CallbackQuery,
+                           state: FSMContext) -> None:
+    await call.answer()
+    state_data = await state.get_data()
+    await state.set_state(AddPostState.waiting_send_import)
+    await call.message.edit_text(
+        text=get_messages_text("IMPORT_POSTS"),
+        reply_markup=await get_back_to_channel_keyboard(
+            channel_id=state_data["channel_id"],
+            channel_name=state_data["channel"]))
+
+
+def get_import_report(report: ImportReport, done: bool) -> str:
+    text = (f"{get_messages_text('IMPORT_DONE' if done else 'IMPORT_FAILED')}"
+            f"{report.imported}")
+    if report.errors:
+        errors = "\n".join(f"Строка {error.line}: {quote(error.error)}"
+                           for error in report.errors[:IMPORT_ERRORS_SHOWN])
+        text += f"\nПропущено строк: {len(report.errors)}\n\n{errors}"
+        if len(report.errors) > IMPORT_ERRORS_SHOWN:
+            text += "\n…"
+    return text
+
+
+@subadmin_router.message(AddPostState.waiting_send_import)
+async def import_posts_file(message: Message,
+                            repo: RequestsRepo,
+                            state: FSMContext,
+                            bot: Bot) -> None:
+    document = message.document
+    if (not document or not document.file_name
+            or not document.file_name.lower().endswith((".jsonl", ".csv"))
+            or (document.file_size or 0) > MAX_IMPORT_SIZE):
+        await message.answer(get_messages_text("IMPORT_ERROR"))
+        return
+
+    state_data = await state.get_data()
+    channel_id = state_data["channel_id"]
+    channel_name = state_data["channel"]
+    await state.set_state(None)
+
+    status = await message.answer(f"{get_messages_text('IMPORT_PROGRESS')}0")
+
+    async def show_progress(report: ImportReport) -> None:
+        try:
+            await status.edit_text(
+                f"{get_messages_text('IMPORT_PROGRESS')}{report.imported}")
+        except TelegramAPIError:
+            # the progress is cosmetic, the import goes on
+            logger.warning("Failed to show the import progress", exc_info=True)
+
+    # the document goes to a temporary file and is parsed line by line from it
+    with tempfile.TemporaryFile() as file:
+        await bot.download(document, destination=file)
+        file.seek(0)
+        report = ImportReport()
+        try:
+            report = await import_posts(repo,
+                                        user_id=message.chat.id,
+                                        channel_id=channel_id,
+                                        rows=read_posts(file, document.file_name),
+                                        on_progress=show_progress,
+                                        report=report)
+            done = True
+        except Exception:
+            logger.exception("Failed to import posts into channel %s", channel_id)
+            await repo.session.rollback()
+            done = False
+
+    await message.answer(
+        text=get_import_report(report, done),
+        reply_markup=await get_back_to_channel_keyboard(
+            channel_id=channel_id,
+            channel_name=channel_name))
+
+
 @subadmin_router.message(F.text.startswith('/delpost_'))
 async def delete_post(message: Message,
                       repo: RequestsRepo,
@@ -281,12 +370,13 @@ async def delete_post(message: Message,
 @subadmin_router.callback_query(F.data.startswith('scheduling_'))
 async def get_scheduling(call: CallbackQuery,
                          repo: RequestsRepo,
+                         config: Config,
                          state: FSMContext) -> None:
     await call.answer()
     call_data = call.data.split("_")
     channel_id = int(call_data[1])
 
-    channel = await repo.channels.get_channel(channel_id=channel_id)
+    channel = await repo.channels.get_channel_schedule(channel_id=channel_id)
 
     total_seconds = channel.post_interval.total_seconds()
     days, hours = divmod(total_seconds, 24 * 3600)
@@ -306,22 +396,48 @@ async def get_scheduling(call: CallbackQuery,
     день часы:минуты
 Пример:
     3 12:30
-Получается, что через каждые 3 дня в 12:30 будет выкладываться пост.''')}"""
+Получается, что через каждые 3 дня в 12:30 будет выкладываться пост.''')}
+
+{hitalic(get_messages_text('MISFIRE_POLICY'))}"""
 
     await state.set_state(
         AddPostIntervalState.waiting_send_interval_timedelta)
     await call.message.edit_text(
         text=text,
-        reply_markup=await get_back_to_channel_keyboard(
+        reply_markup=await get_scheduling_keyboard(
+            channel_id=channel_id,
+            channel_name=channel.name,
+            misfire_policy=(channel.misfire_policy
+                            or config.scheduler.misfire_policy)))
+
+
+@subadmin_router.callback_query(F.data.startswith('misfire_'))
+async def set_misfire_policy(call: CallbackQuery,
+                             repo: RequestsRepo,
+                             state: FSMContext) -> None:
+    _, misfire_policy, channel_id = call.data.split("_")
+    channel_id = int(channel_id)
+    if misfire_policy not in MISFIRE_POLICIES:
+        await call.answer(text=get_messages_text("MISFIRE_POLICY_ERROR"),
+                          show_alert=True)
+        return
+    state_data = await state.get_data()
+
+    await repo.channels.update_misfire_policy(channel_id=channel_id,
+                                              misfire_policy=misfire_policy)
+    await call.answer(text=get_messages_text("MISFIRE_POLICY_UPDATED"))
+    await call.message.edit_reply_markup(
+        reply_markup=await get_scheduling_keyboard(
             channel_id=channel_id,
-            channel_name=channel.name))
+            channel_name=state_data["channel"],
+            misfire_policy=misfire_policy))
 
 
 @subadmin_router.message(AddPostIntervalState.waiting_send_interval_timedelta)
 async def save_post(message: Message,
                     repo: RequestsRepo,
                     bot: Bot,
-                    scheduler: AsyncIOScheduler,
+                    scheduler: PostingScheduler,
                     state: FSMContext) -> None:
     state_data = await state.get_data()
     channel_id = int(state_data["channel_id"])
@@ -346,28 +462,11 @@ async def save_post(message: Message,
         channel_id=channel_id,
         interval_timedelta=interval_timedelta)
 
-    job = scheduler.get_job(f'{channel_id}')
-    if job:
-        scheduler.remove_job(f'{channel_id}')
-        logging.info(f"JOB REMOVED: {job}")
-
-    trigger = CronTrigger(
-        year="*",
-        month="*",
-        day=int(days) if days else "*",
-        hour=int(hours) if hours else 0,
-        minute=int(minutes) if minutes else 0,
-        second=0
-        )
-    scheduler.add_job(send_message_interval,
-                    trigger=trigger,
-                    id=f'{channel_id}',
-                    kwargs={
-                        "chat_id": channel_id,
-                        "bot": bot,
-                        "repo": repo,
-                        })
-    logging.info("JOB ADDED")
+    channel_row = await repo.channels.get_channel_schedule(channel_id=channel_id)
+    if channel_row.bot_is_on == "on":
+        scheduler.schedule(channel_id,
+                           interval_timedelta,
+                           channel_row.last_post_at)
 
     await message.answer(
         text=get_messages_text("INTERVAL_ADDED"),
@@ -1,16 +1,18 @@
 import logging
 
-from aiogram import F, Router, Bot
+from aiogram import F, Router
 from aiogram.filters import CommandStart, Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
+from infrastructure.database.models.roles import ADMIN
 from infrastructure.database.repo.requests import RequestsRepo
 from infrastructure.service_layer.users import get_or_create_user
 from tgbot.helpers.message_text import get_messages_text
-from tgbot.config import Config
 from tgbot.filters.user import AddAdminFilter
 from tgbot.misc.states import TechSupporttState
+from tgbot.services.outbox import enqueue_broadcast
+from tgbot.services.roles import RoleRegistry
 from tgbot.keyboards.user import (get_main_keyboard,
                                   get_back_keyboard,
                                   get_support_keyboard)
@@ -24,22 +26,14 @@ user_router.callback_query.filter(F.message.chat.type == "private")
 
 @user_router.message(AddAdminFilter())
 async def add_admin(message: Message,
-                    config: Config,
+                    roles: RoleRegistry,
                     repo: RequestsRepo,
                     state: FSMContext) -> None:
     await state.clear()
 
-    if not message.from_user.id in config.tg_bot.admin_ids:
-        config.tg_bot.admin_ids.append(message.from_user.id)
-
-        if not config.tg_bot.subadmins_ids:
-            config.tg_bot.subadmins_ids = []
-
-        if not message.from_user.id in config.tg_bot.subadmins_ids:
-            config.tg_bot.subadmins_ids.append(message.from_user.id)
-            await repo.configs.update_subadmin_ids(config.tg_bot.subadmins_ids)
-
-        await repo.configs.update_admin_ids(config.tg_bot.admin_ids)
+    if not roles.is_admin(message.from_user.id):
+        # an admin has the subadmin permissions as well
+        await roles.grant(repo, message.from_user.id, ADMIN)
         await message.answer(text=get_messages_text("ADD_ADMIN"))
     else:
         await message.answer(text=get_messages_text("EXISTED_ADMIN"))
@@ -116,18 +110,16 @@ async def get_tech_support(call: CallbackQuery,
 @user_router.message(TechSupporttState.waiting_send_techsup)
 async def sent_support_request(message: Message,
                                state: FSMContext,
-                               config: Config,
-                               bot: Bot) -> None:
+                               roles: RoleRegistry,
+                               repo: RequestsRepo) -> None:
     await state.clear()
 
-    for admin_id in config.tg_bot.admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text=f'New issue: #id{message.chat.id}\
+    await enqueue_broadcast(
+        repo,
+        broadcast_key=f"support:{message.chat.id}:{message.message_id}",
+        users=sorted(roles.admins),
+        text=f'New issue: #id{message.chat.id}\
                        \n\nMessage text:\n  {message.text}')
-        except:
-            logging.info(f'ЧАТ НЕ НАЙДЕН {admin_id}')
 
     await message.answer(text=get_messages_text('SUPPORT_REQUES_SENT'),
                          reply_markup=await get_back_keyboard())
@@ -79,6 +79,12 @@ def get_messages_text(message_key: str) -> str:
 ⚠️  У вас пока нет постов для этого канала!
 ''',
 
+    'POSTS_PAGE':
+'''📰  Посты этого канала:''',
+
+    'POST_NOT_FOUND':
+'''⚠️  Пост не найден!''',
+
     'YOUR_POSTS':
 '''
 📰  Количество постов для этого канала:
@@ -96,6 +102,32 @@ def get_messages_text(message_key: str) -> str:
 Пришлите пост ввиде текста, либо изображения с текстом, либо просто изображение.
 ''',
 
+    'IMPORT_POSTS':
+'''
+📥  Отправьте файл с постами документом (до 20 МБ).
+
+JSON Lines (.jsonl) - по одному посту в строке:
+<code>{"text": "Текст поста", "images": ["file_id", "file_id"]}</code>
+
+CSV (.csv) - первая строка с названиями колонок <code>text</code> и <code>images</code>, file_id изображений через пробел.
+
+Изображения - это file_id фотографий, уже отправленных боту. Строки с ошибками будут пропущены.
+''',
+
+    'IMPORT_ERROR':
+'''
+❌  Пришлите файл .jsonl или .csv документом, не больше 20 МБ.
+''',
+
+    'IMPORT_PROGRESS':
+'''⏳  Импорт постов... Добавлено: ''',
+
+    'IMPORT_DONE':
+'''✅  Импорт завершен. Добавлено постов: ''',
+
+    'IMPORT_FAILED':
+'''❌  Импорт прерван из-за ошибки. Добавлено постов: ''',
+
     'POST_ADDED':
 '''
 ✅  Пост добавлен в базу.
@@ -121,6 +153,15 @@ def get_messages_text(message_key: str) -> str:
 ✅  Интервал обновлен.
 ''',
 
+    'MISFIRE_POLICY':
+'''Ниже можно выбрать, что делать с постами, пропущенными, пока бот не работал.''',
+
+    'MISFIRE_POLICY_UPDATED':
+'''✅  Настройка пропущенных постов обновлена.''',
+
+    'MISFIRE_POLICY_ERROR':
+'''❌  Неизвестная настройка пропущенных постов.''',
+
     # Admin
     'ADD_ADMIN':
 '''
@@ -164,6 +205,10 @@ def get_messages_text(message_key: str) -> str:
 Эта возможность добавлена, чтобы администратор мог дать другим людям доступ к боту.
 
 
+/dbstats - Состояние пула соединений с базой данных.
+
+/ratestats - Очередь и ожидание ограничителя частоты отправки сообщений.
+
 /del_admin - Удалить себя, как админа.
 ''',
 }
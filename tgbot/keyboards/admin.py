@@ -79,6 +79,9 @@ async def get_posts_keyboard(channel_id: int,
         InlineKeyboardButton(
             text="📝  Добавить посты",
             callback_data="add_posts"),
+        InlineKeyboardButton(
+            text="📥  Импорт постов из файла",
+            callback_data="import_posts"),
         InlineKeyboardButton(
             text="🔙  Назад",
             callback_data=f"channel_*_{channel}_*_prof_*_{channel_id}")
@@ -94,6 +97,9 @@ async def get_all_posts_keyboard(channel_id: int,
         InlineKeyboardButton(
             text="📝  Добавить посты",
             callback_data="add_posts"),
+        InlineKeyboardButton(
+            text="📥  Импорт постов из файла",
+            callback_data="import_posts"),
         InlineKeyboardButton(
             text="🔙  Назад",
             callback_data=f"channel_*_{channel}_*_prof_*_{channel_id}")
@@ -102,6 +108,31 @@ async def get_all_posts_keyboard(channel_id: int,
     return kb.as_markup()
 
 
+async def get_posts_page_keyboard(channel_id: int,
+                                  channel: str,
+                                  first_id: int,
+                                  last_id: int,
+                                  has_prev: bool,
+                                  has_next: bool) -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(
+            text="⬅️", callback_data=f"posts_prev_{first_id}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(
+            text="➡️", callback_data=f"posts_next_{last_id}"))
+    if navigation:
+        kb.row(*navigation)
+    kb.row(InlineKeyboardButton(
+        text="📝  Добавить посты",
+        callback_data="add_posts"))
+    kb.row(InlineKeyboardButton(
+        text="🔙  Назад",
+        callback_data=f"channel_*_{channel}_*_prof_*_{channel_id}"))
+    return kb.as_markup()
+
+
 async def get_back_to_channel_keyboard(
         channel_id: int,
         channel_name: str) -> InlineKeyboardMarkup:
@@ -115,6 +146,30 @@ async def get_back_to_channel_keyboard(
     return kb.as_markup()
 
 
+async def get_scheduling_keyboard(
+        channel_id: int,
+        channel_name: str,
+        misfire_policy: str) -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    policies = {
+        "skip": "Пропускать пропущенные посты",
+        "coalesce": "Выложить один пропущенный пост",
+        "replay": "Догонять пропущенные посты",
+    }
+    buttons = [
+        InlineKeyboardButton(
+            text=f"{'✅' if policy == misfire_policy else '☑️'}  {text}",
+            callback_data=f"misfire_{policy}_{channel_id}")
+        for policy, text in policies.items()
+    ]
+    buttons.append(InlineKeyboardButton(
+        text="🔙  Назад",
+        callback_data=f"channel_*_{channel_name}_*_prof_*_{channel_id}"))
+    kb.add(*buttons)
+    kb.adjust(1)
+    return kb.as_markup()
+
+
 async def get_back_keyboard() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
     kb.add(*[
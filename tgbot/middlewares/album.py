@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.types import Message
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Collects the messages of a media group and passes them to the handler once.
+
+    Telegram delivers every item of an album as a separate message with the
+    same `media_group_id`. The first message waits `latency` seconds for the
+    rest and then calls the handler with all of them in `data["album"]`; the
+    other messages of the group are dropped.
+
+    With the Redis FSM storage the album is collected in Redis, so the items
+    of one album can reach different webhook processes.
+    """
+
+    def __init__(self, latency: float = 0.6, expire: int = 60) -> None:
+        self.latency = latency
+        self.expire = expire
+        self.albums: Dict[str, list[Message]] = {}
+
+    async def __call__(
+            self,
+            handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+            event: Message,
+            data: Dict[str, Any]
+    ) -> Any:
+        if not event.media_group_id:
+            return await handler(event, data)
+
+        storage = data.get("fsm_storage")
+        if isinstance(storage, RedisStorage):
+            album = await self._collect_in_redis(storage, event, data["bot"])
+        else:
+            album = await self._collect(event)
+        if album is None:
+            return
+        data["album"] = sorted(album, key=lambda message: message.message_id)
+        return await handler(event, data)
+
+    async def _collect(self, event: Message) -> list[Message] | None:
+        album = self.albums.get(event.media_group_id)
+        if album is not None:
+            album.append(event)
+            return None
+
+        self.albums[event.media_group_id] = [event]
+        await asyncio.sleep(self.latency)
+        return self.albums.pop(event.media_group_id)
+
+    async def _collect_in_redis(self,
+                                storage: RedisStorage,
+                                event: Message,
+                                bot) -> list[Message] | None:
+        key = f"album:{bot.id}:{event.chat.id}:{event.media_group_id}"
+        async with storage.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, event.model_dump_json(exclude_none=True))
+            pipe.expire(key, self.expire)
+            length, _ = await pipe.execute()
+        if length > 1:
+            return None
+
+        await asyncio.sleep(self.latency)
+        async with storage.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, 1, -1)
+            pipe.delete(key)
+            items, _ = await pipe.execute()
+        return [event] + [Message.model_validate_json(item, context={"bot": bot})
+                          for item in items]
@@ -1,14 +1,86 @@
+import asyncio
+import time
+from collections import OrderedDict
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.types import Message
 
-from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.repo.requests import LazyRequestsRepo
+from tgbot.services.user_cache import UserSnapshot
+from tgbot.services.user_writer import UserWriter
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    def __init__(self, session_pool) -> None:
+    """
+    Gives the handler a repository and makes sure the user is stored.
+
+    The repository opens its database session only when the handler first
+    uses it and closes it as soon as the handler returns, so handlers that
+    never touch the database do not take a connection from the pool.
+
+    By default the update is a unit of work: the repositories only flush and
+    the middleware commits once after the handler, or rolls everything back
+    if the handler fails. A handler can still commit earlier with
+    `repo.commit()`, and `unit_of_work=False` restores a commit per
+    repository call.
+
+    The user is written only when the cache does not know it or its
+    Telegram profile changed, most updates come from known users and need
+    no write at all. Writes go through the batching user writer; only an
+    unknown user waits for its batch, since the handler may rely on the row.
+
+    With a replica pool the menus read from the read replica. A user who
+    changed something reads from the primary for `read_your_writes_window`
+    seconds, so the next screen does not show the state from before the
+    change while the replica catches up. With the Redis FSM storage the
+    window is kept in Redis and holds across all processes and replicas;
+    otherwise it lives in this process, and the next update of the user may
+    reach another process and read stale data from the replica.
+    """
+
+    def __init__(self,
+                 session_pool,
+                 user_writer: UserWriter,
+                 unit_of_work: bool = True,
+                 replica_pool=None,
+                 read_your_writes_window: float = 5.0) -> None:
         self.session_pool = session_pool
+        self.user_writer = user_writer
+        self.unit_of_work = unit_of_work
+        self.replica_pool = replica_pool
+        self.read_your_writes_window = read_your_writes_window
+        # user_id -> when the user last wrote, oldest first
+        self._writes: OrderedDict[int, float] = OrderedDict()
+
+    async def wrote_recently(self, user_id: int, storage: BaseStorage | None = None) -> bool:
+        """
+        Tells whether the user wrote within the read-your-writes window.
+
+        Args:
+            user_id (int): The unique identifier of the user.
+            storage (BaseStorage | None): The FSM storage, the window is shared through it when it is Redis.
+        """
+        if isinstance(storage, RedisStorage):
+            return bool(await storage.redis.exists(self._key(user_id)))
+        deadline = time.monotonic() - self.read_your_writes_window
+        while self._writes and next(iter(self._writes.values())) < deadline:
+            self._writes.popitem(last=False)
+        return user_id in self._writes
+
+    async def mark_written(self, user_id: int, storage: BaseStorage | None = None) -> None:
+        if isinstance(storage, RedisStorage):
+            await storage.redis.set(self._key(user_id), 1,
+                                    px=int(self.read_your_writes_window * 1000))
+            return
+        self._writes[user_id] = time.monotonic()
+        self._writes.move_to_end(user_id)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"read_your_writes:{user_id}"
 
     async def __call__(
         self,
@@ -16,24 +88,34 @@ class DatabaseMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.session_pool() as session:
-            repo = RequestsRepo(session)
-            data["session"] = session
-            data["repo"] = repo
-
+        user_id = event.from_user.id
+        storage = data.get("fsm_storage")
+        repo = LazyRequestsRepo(
+            self.session_pool,
+            self.unit_of_work,
+            replica_pool=self.replica_pool,
+            read_your_writes=(self.replica_pool is not None
+                              and await self.wrote_recently(user_id, storage)))
+        data["repo"] = repo
+        try:
             # if the user click on the /start button, we mustn't create him in the database
-            if isinstance(event, Message) and event.text and event.text.startswith("/start"):
-                return await handler(event, data)
-
-            # add the user to data
-            user = await repo.users.get_or_create_user(
-                event.from_user.id,
-                str(event.from_user.id),  # store the user_id as username
-                event.from_user.first_name,
-                event.from_user.last_name,
-                event.from_user.username,
-            )
-            data["user"] = user
+            if not (isinstance(event, Message) and event.text
+                    and event.text.startswith("/start")):
+                # add the user to data
+                user = UserSnapshot.from_telegram(event.from_user)
+                cached = self.user_writer.cache.get(user.user_id)
+                if cached != user:
+                    written = self.user_writer.add(user)
+                    if cached is None:
+                        await asyncio.shield(written)
+                data["user"] = user
 
             result = await handler(event, data)
-        return result
+            if repo.is_open:
+                await repo.commit()
+            if self.replica_pool is not None and repo.wrote:
+                await self.mark_written(user_id, storage)
+            return result
+        finally:
+            # rolls back whatever the failed handler left uncommitted
+            await repo.close()
@@ -0,0 +1,57 @@
+from typing import TYPE_CHECKING
+
+from aiogram.client.session.middlewares.base import (BaseRequestMiddleware,
+                                                     NextRequestMiddlewareType)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from tgbot.services.rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+# API methods that deliver a new message to a chat
+THROTTLED_METHODS = ("send", "copy", "forward")
+
+
+def get_rate_limiter(bot: "Bot") -> RateLimiter | None:
+    """
+    Returns the rate limiter on the session of the bot, None if it has none.
+    """
+    for middleware in bot.session.middleware:
+        if isinstance(middleware, RateLimitMiddleware):
+            return middleware.limiter
+    return None
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that routes every outgoing message through the rate limiter.
+    """
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: "Bot",
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        if (not api_method.startswith(THROTTLED_METHODS)
+                or api_method == "sendChatAction"):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        if not isinstance(chat_id, int):
+            # @channelusername targets are only limited globally
+            chat_id = None
+
+        await self.limiter.acquire(chat_id)
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            self.limiter.flood_wait(chat_id, e.retry_after)
+            raise
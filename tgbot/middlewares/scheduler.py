@@ -2,11 +2,12 @@ from typing import Dict, Any, Callable, Awaitable
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from tgbot.services.scheduler import PostingScheduler
 
 
 class SchedulerMiddleware(BaseMiddleware):
-    def __init__(self, scheduler: AsyncIOScheduler) -> None:
+    def __init__(self, scheduler: PostingScheduler) -> None:
         self.scheduler = scheduler
 
     async def __call__(
@@ -7,6 +7,7 @@ class ExampleState(StatesGroup):
 
 class AddPostState(StatesGroup):
     waiting_send_post = State()
+    waiting_send_import = State()
 
 
 class AddPostIntervalState(StatesGroup):
@@ -0,0 +1,103 @@
+"""
+Local stand-in for the Telegram webhook sender.
+
+Posts fake updates to a running webhook the way Telegram does: JSON bodies,
+the secret token header and a limited number of parallel connections. It
+reports how fast the webhook answers, which does not depend on how long the
+handlers take since they run in the background.
+
+Usage example:
+    python -m tgbot.misc.webhook_sender --url http://localhost:8080/webhook --updates 1000
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import ClientSession, TCPConnector
+
+
+def fake_update(update_id: int, user_id: int, text: str) -> dict:
+    """
+    Builds a private text message update from the given user.
+    """
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+            "entities": ([{"type": "bot_command", "offset": 0, "length": len(text)}]
+                         if text.startswith("/") else []),
+        },
+    }
+
+
+async def send_updates(url: str,
+                       updates: int,
+                       connections: int = 40,
+                       secret: str | None = None,
+                       users: int = 100,
+                       text: str = "/start") -> list[float]:
+    """
+    Posts the updates to the webhook and returns the answer time of each one.
+
+    Args:
+        url (str): The webhook url.
+        updates (int): The number of updates to send.
+        connections (int): The number of parallel connections, 40 like Telegram's default.
+        secret (str | None): The secret token of the webhook.
+        users (int): The number of distinct fake users the updates come from.
+        text (str): The text of the messages.
+
+    Returns:
+        list[float]: The answer times in seconds.
+    """
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for update_id in range(1, updates + 1):
+        queue.put_nowait(update_id)
+    timings = []
+
+    async def connection(session: ClientSession) -> None:
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            update = fake_update(update_id, 10_000 + update_id % users, text)
+            started_at = time.monotonic()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                if response.status != 200:
+                    print(f"Update {update_id}: HTTP {response.status}")
+            timings.append(time.monotonic() - started_at)
+
+    async with ClientSession(connector=TCPConnector(limit=connections)) as session:
+        await asyncio.gather(*(connection(session) for _ in range(connections)))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default="http://localhost:8080/webhook")
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--secret")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--text", default="/start")
+    args = parser.parse_args()
+
+    started_at = time.monotonic()
+    timings = sorted(asyncio.run(send_updates(args.url, args.updates, args.connections,
+                                              args.secret, args.users, args.text)))
+    elapsed = time.monotonic() - started_at
+    if not timings:
+        return
+    print(f"{len(timings)} updates in {elapsed:.2f} s ({len(timings) / elapsed:.0f} updates/s)")
+    print(f"answer time: median {timings[len(timings) // 2] * 1000:.1f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1000:.1f} ms, "
+          f"max {timings[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import asyncio
 import logging
-from typing import Union
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Union
 
 from aiogram import Bot
 from aiogram import exceptions
@@ -17,6 +19,9 @@ async def send_message(
     """
     Safe messages sender
 
+    Flood control errors are not handled here: `TelegramRetryAfter` is raised
+    so the caller can retry the message later without blocking.
+
     :param bot: Bot instance.
     :param user_id: user id. If str - must contain only digits.
     :param text: text of the message.
@@ -35,14 +40,8 @@ async def send_message(
         logging.error("Telegram server says - Bad Request: chat not found")
     except exceptions.TelegramForbiddenError:
         logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
-    except exceptions.TelegramRetryAfter as e:
-        logging.error(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
-        )
-        await asyncio.sleep(e.retry_after)
-        return await send_message(
-            bot, user_id, text, disable_notification, reply_markup
-        )  # Recursive call
+    except exceptions.TelegramRetryAfter:
+        raise
     except exceptions.TelegramAPIError:
         logging.exception(f"Target [ID:{user_id}]: failed")
     else:
@@ -51,6 +50,146 @@ async def send_message(
     return False
 
 
+@dataclass
+class BroadcastResult:
+    """
+    Progress and final counts of a broadcast.
+
+    Attributes:
+        total (int): The number of recipients.
+        sent (int): The number of delivered messages.
+        failed (int): The number of recipients the message could not be delivered to.
+        retried (int): The number of flood control retries.
+        started_at (float): The monotonic time the broadcast started at.
+    """
+
+    total: int
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    started_at: float = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def rate(self) -> float:
+        """Delivered messages per second."""
+        elapsed = time.monotonic() - self.started_at
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+
+class Broadcaster:
+    """
+    Broadcast engine with a bounded number of concurrent senders.
+
+    Workers pull recipients from a shared queue. A recipient that hit flood
+    control is put back on the queue once its not-before time has passed
+    instead of holding a worker, so the other recipients keep flowing. The
+    actual pace is set by the rate limiter of the bot session.
+
+    Attributes:
+        bot (Bot): The bot instance.
+        workers (int): The number of concurrent senders.
+        max_retries (int): The number of flood control retries per recipient.
+        on_progress: Coroutine called with the result every `progress_every` recipients.
+        progress_every (int): How often to report progress.
+    """
+
+    def __init__(self,
+                 bot: Bot,
+                 workers: int = 30,
+                 max_retries: int = 3,
+                 on_progress: Optional[Callable[[BroadcastResult], Awaitable]] = None,
+                 progress_every: int = 1000) -> None:
+        self.bot = bot
+        self.workers = workers
+        self.max_retries = max_retries
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+
+    async def broadcast(
+        self,
+        users: list[Union[str, int]],
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: InlineKeyboardMarkup = None,
+    ) -> BroadcastResult:
+        """
+        Sends the message to every user and returns the final counts.
+
+        :param users: List of users.
+        :param text: Text of the message.
+        :param disable_notification: Disable notification or not.
+        :param reply_markup: Reply markup.
+        :return: Final counts of the broadcast.
+        """
+        result = BroadcastResult(total=len(users), started_at=time.monotonic())
+        if not users:
+            return result
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[tuple[Union[str, int], int]] = asyncio.Queue()
+        finished = asyncio.Event()
+        # retries waiting for their not-before time
+        timers: list[asyncio.TimerHandle] = []
+        for user_id in users:
+            queue.put_nowait((user_id, 0))
+
+        async def complete(success: bool) -> None:
+            if success:
+                result.sent += 1
+            else:
+                result.failed += 1
+            if result.done == result.total:
+                finished.set()
+            if self.on_progress and result.done % self.progress_every == 0:
+                try:
+                    await self.on_progress(result)
+                except Exception:
+                    # a failed report must not stop the worker or the broadcast
+                    logging.exception("Failed to report the broadcast progress")
+
+        async def worker() -> None:
+            while True:
+                user_id, attempts = await queue.get()
+                try:
+                    success = await send_message(
+                        self.bot, user_id, text, disable_notification, reply_markup
+                    )
+                except exceptions.TelegramRetryAfter as e:
+                    if attempts >= self.max_retries:
+                        logging.error(f"Target [ID:{user_id}]: flood limit, giving up")
+                        await complete(False)
+                        continue
+                    logging.warning(
+                        f"Target [ID:{user_id}]: Flood limit is exceeded. "
+                        f"Retry in {e.retry_after} seconds."
+                    )
+                    result.retried += 1
+                    timers.append(loop.call_later(
+                        e.retry_after, queue.put_nowait, (user_id, attempts + 1)))
+                    continue
+                await complete(success)
+
+        tasks = [asyncio.create_task(worker())
+                 for _ in range(min(self.workers, len(users)))]
+        try:
+            await finished.wait()
+        finally:
+            for timer in timers:
+                timer.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logging.info(
+                f"{result.sent} messages successful sent, {result.failed} failed, "
+                f"{result.retried} retried ({result.rate:.1f} msg/s)."
+            )
+        return result
+
+
 async def broadcast(
     bot: Bot,
     users: list[Union[str, int]],
@@ -59,7 +198,7 @@ async def broadcast(
     reply_markup: InlineKeyboardMarkup = None,
 ) -> int:
     """
-    Simple broadcaster.
+    Simple broadcaster. The pace is set by the rate limiter of the bot session.
     :param bot: Bot instance.
     :param users: List of users.
     :param text: Text of the message.
@@ -67,17 +206,7 @@ async def broadcast(
     :param reply_markup: Reply markup.
     :return: Count of messages.
     """
-    count = 0
-    try:
-        for user_id in users:
-            if await send_message(
-                bot, user_id, text, disable_notification, reply_markup
-            ):
-                count += 1
-            await asyncio.sleep(
-                0.05
-            )  # 20 messages per second (Limit: 30 messages per second)
-    finally:
-        logging.info(f"{count} messages successful sent.")
-
-    return count
+    result = await Broadcaster(bot).broadcast(
+        users, text, disable_notification, reply_markup
+    )
+    return result.sent
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+import asyncpg
+
+from infrastructure.database.repo.base import INVALIDATION_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[str], Awaitable[None]]
+
+
+def matches(key: str, prefix: str) -> bool:
+    """Checks whether the key is the prefix itself or lies under it, like "channel:42" under "channel"."""
+    return key == prefix or key.startswith(prefix + ":")
+
+
+class InvalidationBus:
+    """
+    Tells every process which cached data changed in the database.
+
+    The repositories publish invalidation keys with pg_notify inside their
+    transaction, so Postgres delivers them only once the change is
+    committed, and drops them with a rollback. Every process listens on a
+    dedicated asyncpg connection and calls the subscribers of the key.
+
+    Notifications sent while the connection is down are lost, so after a
+    reconnect every subscriber is called with its own prefix: everything
+    under it may be stale.
+
+    Attributes:
+        dsn (str): The Postgres DSN of the listening connection.
+        channel (str): The notification channel.
+        interval (float): Seconds between the health checks of the connection.
+        reconnect_interval (float): Seconds to wait before connecting again.
+    """
+
+    def __init__(self,
+                 dsn: str,
+                 channel: str = INVALIDATION_CHANNEL,
+                 interval: float = 30.0,
+                 reconnect_interval: float = 5.0) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.interval = interval
+        self.reconnect_interval = reconnect_interval
+        self._subscribers: list[tuple[str, Subscriber]] = []
+        self._task: asyncio.Task | None = None
+        self._callbacks: set[asyncio.Task] = set()
+
+    def subscribe(self, prefix: str, callback: Subscriber) -> None:
+        """
+        Calls the callback with every published key equal to the prefix or under it.
+
+        Args:
+            prefix (str): The key prefix, like "roles" or "channel".
+            callback (Subscriber): Coroutine function taking the key.
+        """
+        self._subscribers.append((prefix, callback))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+
+    def _on_notification(self, connection, pid: int, channel: str, key: str) -> None:
+        self._dispatch(key)
+
+    def _dispatch(self, key: str) -> None:
+        for prefix, callback in self._subscribers:
+            if matches(key, prefix):
+                self._call(callback, key)
+
+    def _call(self, callback: Subscriber, key: str) -> None:
+        task = asyncio.create_task(self._invoke(callback, key))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    @staticmethod
+    async def _invoke(callback: Subscriber, key: str) -> None:
+        try:
+            await callback(key)
+        except Exception:
+            logger.exception("Failed to invalidate %s", key)
+
+    async def _run(self) -> None:
+        reconnect = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except Exception:
+                logger.exception("Failed to connect the invalidation listener")
+                await asyncio.sleep(self.reconnect_interval)
+                reconnect = True
+                continue
+
+            try:
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                if reconnect:
+                    for prefix, callback in self._subscribers:
+                        self._call(callback, prefix)
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.interval)
+                    except asyncio.TimeoutError:
+                        await asyncio.wait_for(connection.execute("SELECT 1"),
+                                               self.interval)
+            except Exception:
+                logger.exception("Lost the invalidation listener connection")
+            finally:
+                connection.terminate()
+
+            await asyncio.sleep(self.reconnect_interval)
+            reconnect = True
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql.functions import func
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Elects one replica of the bot to run a task, using a Postgres advisory lock.
+
+    Every replica keeps one connection of the engine and tries to take the
+    session-level advisory lock `key` on it every `interval` seconds. The
+    replica holding the lock is the leader: `on_elected` is called when it
+    takes the lock and `on_demoted` when it loses or releases it.
+
+    The lock belongs to the database connection, so when the leader process
+    dies Postgres drops the lock together with the connection and another
+    replica takes over on its next attempt. TCP keepalives on the server side
+    make sure a connection of a crashed host is noticed within a few
+    intervals as well. The leader checks its connection every interval and
+    steps down as soon as it is lost.
+
+    Attributes:
+        engine (AsyncEngine): The database engine.
+        key (int): The advisory lock identifying the task.
+        on_elected: Coroutine called when this replica becomes the leader.
+        on_demoted: Coroutine called when this replica stops being the leader.
+        interval (float): Seconds between lock attempts and connection checks.
+    """
+
+    def __init__(self,
+                 engine: AsyncEngine,
+                 key: int,
+                 on_elected: Callable[[], Awaitable],
+                 on_demoted: Callable[[], Awaitable],
+                 interval: float = 5.0) -> None:
+        self.engine = engine
+        self.key = key
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval = interval
+
+        self.is_leader = False
+        self._runner: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Starts taking part in the election in the background."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Leaves the election, releasing the lock if this replica holds it."""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.engine.connect() as conn:
+                    await self._campaign(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Leader election connection failed")
+            await asyncio.sleep(self.interval)
+
+    async def _campaign(self, conn: AsyncConnection) -> None:
+        # no transaction stays open while the lock is held
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        keepalive = max(int(self.interval), 1)
+        await conn.execute(text(f"SET tcp_keepalives_idle = {keepalive}"))
+        await conn.execute(text(f"SET tcp_keepalives_interval = {keepalive}"))
+        await conn.execute(text("SET tcp_keepalives_count = 3"))
+
+        try:
+            while True:
+                if self.is_leader:
+                    await asyncio.wait_for(conn.execute(select(1)), self.interval)
+                elif await conn.scalar(select(func.pg_try_advisory_lock(self.key))):
+                    self.is_leader = True
+                    logger.info("Elected as the leader of lock %s", self.key)
+                    await self.on_elected()
+                await asyncio.sleep(self.interval)
+        finally:
+            if self.is_leader:
+                await self._step_down(conn)
+
+    async def _step_down(self, conn: AsyncConnection) -> None:
+        self.is_leader = False
+        logger.info("Stepping down as the leader of lock %s", self.key)
+        try:
+            await self.on_demoted()
+        finally:
+            try:
+                await conn.scalar(select(func.pg_advisory_unlock(self.key)))
+            except Exception:
+                # the connection is gone and the lock with it, keep it out of the pool
+                await conn.invalidate()
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram import exceptions
+from aiogram.types import InputMediaPhoto
+
+from infrastructure.database.models import OutboxMessage
+from infrastructure.database.repo.requests import RequestsRepo
+
+logger = logging.getLogger(__name__)
+
+# the maximum number of items in a Telegram media group
+MEDIA_GROUP_LIMIT = 10
+
+
+def album_media(images_ids: list[str],
+                caption: Optional[str]) -> list[InputMediaPhoto]:
+    """
+    Builds the items of a media group, the caption goes to the first one.
+    """
+    return [
+        InputMediaPhoto(media=image_id, caption=caption if index == 0 else None)
+        for index, image_id in enumerate(images_ids[:MEDIA_GROUP_LIMIT])
+    ]
+
+
+async def send_post(bot: Bot,
+                    chat_id: Union[int, str],
+                    text: Optional[str],
+                    images_ids: Optional[list[str]] = None) -> None:
+    """
+    Sends a post with a single API call.
+
+    Several images go out as one media group with the text as the caption of
+    the first one, a single image as a photo, no images as a text message.
+    """
+    if images_ids and len(images_ids) > 1:
+        await bot.send_media_group(chat_id=chat_id, media=album_media(images_ids, text))
+    elif images_ids:
+        await bot.send_photo(chat_id=chat_id, photo=images_ids[0], caption=text)
+    else:
+        await bot.send_message(chat_id=chat_id, text=text)
+
+
+async def enqueue_broadcast(repo: RequestsRepo,
+                            broadcast_key: str,
+                            users: list[int],
+                            text: str) -> int:
+    """
+    Puts a text message for every user into the outbox.
+
+    Args:
+        repo (RequestsRepo): The repository to write to.
+        broadcast_key (str): Unique key of the broadcast, queuing it again is a no-op.
+        users (list[int]): The recipients.
+        text (str): The text of the message.
+
+    Returns:
+        int: The number of queued messages.
+    """
+    return await repo.outbox.enqueue([
+        {
+            "idempotency_key": f"{broadcast_key}:{user_id}",
+            "chat_id": user_id,
+            "payload": {"text": text},
+        }
+        for user_id in users
+    ])
+
+
+class OutboxWorker:
+    """
+    Pool of workers delivering the messages of the `outbox` table.
+
+    One task claims batches of due messages with `FOR UPDATE SKIP LOCKED`
+    and a lease, the sender tasks deliver them and mark every message as sent
+    right away. After a crash or deploy the unmarked messages become
+    claimable again once their lease expires, and any number of replicas can
+    drain the same outbox side by side.
+
+    Attributes:
+        bot (Bot): The bot instance.
+        session_pool: Session pool object for the database using SQLAlchemy.
+        workers (int): The number of concurrent senders.
+        batch_size (int): The number of messages claimed at once.
+        lease (timedelta): How long a claimed message stays locked to this worker.
+        poll_interval (float): Seconds between claims when the outbox is empty.
+        max_attempts (int): Attempts before a message is marked as failed.
+        keep_sent (timedelta): How long delivered messages are kept for deduplication.
+        shutdown_timeout (float): Seconds the shutdown waits for the sends in progress.
+    """
+
+    def __init__(self,
+                 bot: Bot,
+                 session_pool,
+                 workers: int = 30,
+                 batch_size: int = 100,
+                 lease: timedelta = timedelta(minutes=5),
+                 poll_interval: float = 1.0,
+                 max_attempts: int = 5,
+                 keep_sent: timedelta = timedelta(days=7),
+                 shutdown_timeout: float = 10.0) -> None:
+        self.bot = bot
+        self.session_pool = session_pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.keep_sent = keep_sent
+        self.shutdown_timeout = shutdown_timeout
+
+        self._queue: asyncio.Queue[OutboxMessage] = asyncio.Queue(batch_size)
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._in_flight: set[int] = set()
+        # claimed by the claiming task but not in the queue yet
+        self._unqueued: list[OutboxMessage] = []
+
+    def start(self) -> None:
+        """Starts the claiming task and the senders in the background."""
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._claim_loop()))
+        self._tasks.extend(asyncio.create_task(self._send_loop())
+                           for _ in range(self.workers))
+
+    def wake(self) -> None:
+        """Makes the worker claim new messages without waiting for the next poll."""
+        self._wakeup.set()
+
+    async def shutdown(self) -> None:
+        """
+        Stops the workers and hands the claimed but unsent messages back.
+
+        The claiming stops first and the queued messages are released, then
+        the sends in progress get `shutdown_timeout` seconds to finish. A send
+        still running after that keeps its lease: the message may already be
+        delivered, so it is only claimed again once the lease expires.
+        """
+        if not self._tasks:
+            return
+        claimer, senders = self._tasks[0], self._tasks[1:]
+        claimer.cancel()
+        await asyncio.gather(claimer, return_exceptions=True)
+
+        unsent = [message.id for message in self._unqueued]
+        self._unqueued = []
+        while not self._queue.empty():
+            unsent.append(self._queue.get_nowait().id)
+        if unsent:
+            async with self.session_pool() as session:
+                await RequestsRepo(session).outbox.release(unsent)
+            logger.info("%s claimed outbox messages released", len(unsent))
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._in_flight:
+            logger.warning("%s outbox messages still sending at shutdown, "
+                           "left to their lease", len(self._in_flight))
+
+        for task in senders:
+            task.cancel()
+        await asyncio.gather(*senders, return_exceptions=True)
+        self._tasks.clear()
+        self._in_flight.clear()
+
+    async def _claim_loop(self) -> None:
+        purged_at = 0.0
+        while True:
+            try:
+                async with self.session_pool() as session:
+                    repo = RequestsRepo(session)
+                    if time.monotonic() - purged_at > 3600:
+                        await repo.outbox.purge_sent(self.keep_sent)
+                        purged_at = time.monotonic()
+                    messages = await repo.outbox.claim_batch(self.batch_size,
+                                                             self.lease)
+            except Exception:
+                logger.exception("Failed to claim outbox messages")
+                messages = []
+
+            for index, message in enumerate(messages):
+                self._unqueued = messages[index:]
+                await self._queue.put(message)
+            self._unqueued = []
+
+            if len(messages) < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _send_loop(self) -> None:
+        while True:
+            message = await self._queue.get()
+            self._in_flight.add(message.id)
+            try:
+                await self._deliver(message)
+            except Exception:
+                logger.exception("Failed to update outbox message %s", message.id)
+            finally:
+                self._in_flight.discard(message.id)
+
+    async def _deliver(self, message: OutboxMessage) -> None:
+        payload = message.payload
+        try:
+            await send_post(self.bot, message.chat_id,
+                            payload.get("text"), payload.get("images"))
+        except exceptions.TelegramRetryAfter as e:
+            # flood control is no failure of the message, the attempt is not counted
+            async with self.session_pool() as session:
+                await RequestsRepo(session).outbox.retry_later(
+                    message.id, timedelta(seconds=e.retry_after), str(e),
+                    count_attempt=False)
+        except (exceptions.TelegramBadRequest,
+                exceptions.TelegramForbiddenError) as e:
+            logger.error("Outbox message %s to %s failed: %s",
+                         message.id, message.chat_id, e)
+            async with self.session_pool() as session:
+                await RequestsRepo(session).outbox.mark_failed(message.id, str(e))
+        except exceptions.TelegramAPIError as e:
+            await self._retry(message,
+                              timedelta(seconds=min(600, 5 * 2 ** message.attempts)),
+                              str(e))
+        else:
+            async with self.session_pool() as session:
+                await RequestsRepo(session).outbox.mark_sent(message.id)
+
+    async def _retry(self, message: OutboxMessage, delay: timedelta, error: str) -> None:
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session)
+            if message.attempts >= self.max_attempts:
+                logger.error("Outbox message %s to %s gave up: %s",
+                             message.id, message.chat_id, error)
+                await repo.outbox.mark_failed(message.id, error)
+            else:
+                await repo.outbox.retry_later(message.id, delay, error)
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, BinaryIO, Callable, Iterable, Iterator, Optional
+
+from infrastructure.database.repo.requests import RequestsRepo
+
+logger = logging.getLogger(__name__)
+
+# Telegram limits of a post
+MAX_TEXT_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+MAX_IMAGES = 10
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedPost:
+    """
+    A post read from the import document.
+
+    Attributes:
+        line (int): The line of the document the post ends on.
+        text (Optional[str]): The text of the post.
+        images (list[str]): The Telegram file ids of the images.
+    """
+
+    line: int
+    text: Optional[str]
+    images: list[str]
+
+
+@dataclass(frozen=True, slots=True)
+class RowError:
+    """
+    A row of the import document that was skipped.
+
+    Attributes:
+        line (int): The line of the document.
+        error (str): Why the row was skipped.
+    """
+
+    line: int
+    error: str
+
+
+@dataclass
+class ImportReport:
+    """
+    The progress of an import.
+
+    Attributes:
+        imported (int): The number of posts stored so far.
+        errors (list[RowError]): The skipped rows.
+    """
+
+    imported: int = 0
+    errors: list[RowError] = field(default_factory=list)
+
+
+def make_post(line: int, text, images) -> ParsedPost | RowError:
+    """
+    Checks the row against the Telegram limits and builds the post.
+
+    Args:
+        line (int): The line of the document.
+        text: The text of the post, None or an empty string for none.
+        images: The image file ids, a list or a string separated by spaces or "|".
+
+    Returns:
+        ParsedPost | RowError: The post, or why the row is skipped.
+    """
+    if text is not None and not isinstance(text, str):
+        return RowError(line, "поле text должно быть строкой")
+    if isinstance(images, str):
+        images = images.replace("|", " ").split()
+    elif images is None:
+        images = []
+    elif not isinstance(images, list) or not all(isinstance(image, str) for image in images):
+        return RowError(line, "поле images должно быть списком file_id")
+
+    text = text.strip() if text else None
+    images = [image.strip() for image in images if image.strip()]
+    if not text and not images:
+        return RowError(line, "пустой пост: нет ни текста, ни изображений")
+    if len(images) > MAX_IMAGES:
+        return RowError(line, f"больше {MAX_IMAGES} изображений")
+    limit = MAX_CAPTION_LENGTH if images else MAX_TEXT_LENGTH
+    if text and len(text) > limit:
+        return RowError(line, f"текст длиннее {limit} символов")
+    return ParsedPost(line, text, images)
+
+
+def parse_jsonl(lines: Iterable[str]) -> Iterator[ParsedPost | RowError]:
+    """
+    Reads JSON Lines: one object per line with "text" and "images", empty lines are skipped.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield RowError(line_number, "строка не является JSON")
+            continue
+        if not isinstance(row, dict):
+            yield RowError(line_number, "строка должна быть JSON-объектом")
+            continue
+        yield make_post(line_number, row.get("text"), row.get("images"))
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[ParsedPost | RowError]:
+    """
+    Reads CSV with a header: the "text" column and the optional "images" column.
+    """
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or "text" not in reader.fieldnames:
+        yield RowError(1, "в первой строке нет колонки text")
+        return
+    try:
+        for row in reader:
+            yield make_post(reader.line_num, row.get("text"), row.get("images"))
+    except csv.Error as e:
+        yield RowError(reader.line_num, f"ошибка CSV: {e}")
+
+
+def read_posts(file: BinaryIO, filename: str) -> Iterator[ParsedPost | RowError]:
+    """
+    Parses the document line by line, without loading it into memory.
+
+    Args:
+        file (BinaryIO): The document, positioned at its start.
+        filename (str): The name of the document, a .csv file is read as CSV
+            and anything else as JSON Lines.
+
+    Returns:
+        Iterator[ParsedPost | RowError]: The posts and the skipped rows, in document order.
+    """
+    lines = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    if filename.lower().endswith(".csv"):
+        return parse_csv(lines)
+    return parse_jsonl(lines)
+
+
+async def import_posts(
+        repo: RequestsRepo,
+        user_id: int,
+        channel_id: int,
+        rows: Iterable[ParsedPost | RowError],
+        batch_size: int = 500,
+        on_progress: Optional[Callable[[ImportReport], Awaitable[None]]] = None,
+        report: Optional[ImportReport] = None,
+) -> ImportReport:
+    """
+    Stores the posts in batches, one multi-row insert and one commit per batch.
+
+    The posts keep the order of the document, after the posts the channel
+    already has. A failed batch stops the import, the earlier batches stay.
+
+    Args:
+        repo (RequestsRepo): The repository of the update.
+        user_id (int): The unique identifier of the user importing the posts.
+        channel_id (int): The unique identifier of the channel.
+        rows (Iterable[ParsedPost | RowError]): The parsed document.
+        batch_size (int): The number of posts stored at once.
+        on_progress: Called with the report after every batch.
+        report (Optional[ImportReport]): The report to fill in, so the caller
+            still has the progress when the import fails.
+
+    Returns:
+        ImportReport: The number of stored posts and the skipped rows.
+    """
+    report = report if report is not None else ImportReport()
+    batch: list[ParsedPost] = []
+
+    async def flush() -> None:
+        await repo.posts.add_posts(user_id, channel_id,
+                                   [(post.text, post.images) for post in batch])
+        # commits even in a unit of work, every batch is durable on its own
+        await repo.commit()
+        report.imported += len(batch)
+        batch.clear()
+        if on_progress is not None:
+            await on_progress(report)
+
+    for row in rows:
+        if isinstance(row, RowError):
+            report.errors.append(row)
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    logger.info("Imported %s posts into channel %s, skipped %s rows",
+                report.imported, channel_id, len(report.errors))
+    return report
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of rejecting requests.
+
+    Tokens may go negative: every reservation takes one token and waits
+    until the bucket would have refilled it, so concurrent callers are
+    served in the order they reserved.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Takes one token and returns how long the caller has to wait for it.
+        """
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, now: float, seconds: float) -> None:
+        """
+        Makes the next reservation wait at least the given number of seconds.
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class RateLimiterStats:
+    """
+    Snapshot of the rate limiter metrics.
+
+    Attributes:
+        waiting (int): The number of sends currently queued in the limiter.
+        sent (int): The number of sends let through since start.
+        delayed (int): The number of sends that had to wait.
+        total_wait (float): The total time spent waiting, in seconds.
+        max_wait (float): The longest single wait, in seconds.
+        flood_waits (int): The number of flood control errors reported.
+        buckets (int): The number of tracked per-chat buckets.
+    """
+
+    waiting: int
+    sent: int
+    delayed: int
+    total_wait: float
+    max_wait: float
+    flood_waits: int
+    buckets: int
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.sent if self.sent else 0.0
+
+
+class RateLimiter:
+    """
+    Rate limiter shared by every outbound message of the bot.
+
+    Every send waits for a token of its chat bucket and then for a token of
+    the global bucket. The defaults follow the Telegram Bot API limits:
+    about 30 messages per second overall, 20 messages per minute in a group
+    or channel and one message per second in a private chat.
+
+    Attributes:
+        global_rate (float): Messages per second for the whole bot.
+        group_rate (float): Messages per second for a group or channel.
+        private_rate (float): Messages per second for a private chat.
+        max_buckets (int): The number of chat buckets kept before idle ones are dropped.
+    """
+
+    def __init__(self,
+                 global_rate: float = 30,
+                 group_rate: float = 20 / 60,
+                 private_rate: float = 1,
+                 max_buckets: int = 10_000) -> None:
+        self.global_rate = global_rate
+        self.group_rate = group_rate
+        self.private_rate = private_rate
+        self.max_buckets = max_buckets
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[int, TokenBucket] = {}
+        self._waiting = 0
+        self._sent = 0
+        self._delayed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._flood_waits = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_buckets:
+                self._drop_idle_buckets()
+            # group and channel ids are negative, user ids are positive
+            rate = self.group_rate if chat_id < 0 else self.private_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, 1)
+        return bucket
+
+    def _drop_idle_buckets(self) -> None:
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items()
+                        if bucket.is_idle(now)]:
+            del self._chats[chat_id]
+
+    async def acquire(self, chat_id: int | None = None) -> float:
+        """
+        Waits until a message to the chat may be sent.
+
+        Args:
+            chat_id (int | None): The target chat, None to use only the global bucket.
+
+        Returns:
+            float: The time spent waiting, in seconds.
+        """
+        started_at = time.monotonic()
+        self._waiting += 1
+        try:
+            if chat_id is not None:
+                delay = self._chat_bucket(chat_id).reserve(time.monotonic())
+                if delay:
+                    await asyncio.sleep(delay)
+            delay = self._global.reserve(time.monotonic())
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - started_at
+        self._sent += 1
+        if waited > 0.001:
+            self._delayed += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    def flood_wait(self, chat_id: int | None, retry_after: float) -> None:
+        """
+        Holds back the chat after Telegram answered with a flood control error.
+
+        Args:
+            chat_id (int | None): The chat the error was reported for.
+            retry_after (float): The number of seconds Telegram asked to wait.
+        """
+        self._flood_waits += 1
+        now = time.monotonic()
+        bucket = self._chat_bucket(chat_id) if chat_id is not None else self._global
+        bucket.pause(now, retry_after)
+        logger.warning("Flood control for %s: waiting %s seconds. %s",
+                       chat_id, retry_after, self.stats())
+
+    def stats(self) -> RateLimiterStats:
+        return RateLimiterStats(
+            waiting=self._waiting,
+            sent=self._sent,
+            delayed=self._delayed,
+            total_wait=self._total_wait,
+            max_wait=self._max_wait,
+            flood_waits=self._flood_waits,
+            buckets=len(self._chats),
+        )
@@ -0,0 +1,140 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from infrastructure.database.models.roles import ADMIN
+from infrastructure.database.repo.requests import RequestsRepo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class RoleSnapshot:
+    """
+    The users with a role at one point in time.
+
+    Attributes:
+        admins (frozenset[int]): The admins.
+        subadmins (frozenset[int]): Everyone with the subadmin permissions, the admins included.
+    """
+
+    admins: frozenset[int] = frozenset()
+    subadmins: frozenset[int] = frozenset()
+
+    @classmethod
+    def from_roles(cls, roles: Iterable[tuple[int, str]]) -> "RoleSnapshot":
+        admins, subadmins = set(), set()
+        for user_id, role in roles:
+            if role == ADMIN:
+                admins.add(user_id)
+            subadmins.add(user_id)
+        return cls(frozenset(admins), frozenset(subadmins))
+
+    def with_role(self, user_id: int, role: Optional[str]) -> "RoleSnapshot":
+        """
+        Returns the snapshot with the role of the user changed, None removes the role.
+        """
+        admins = self.admins - {user_id}
+        subadmins = self.subadmins - {user_id}
+        if role == ADMIN:
+            admins |= {user_id}
+        if role is not None:
+            subadmins |= {user_id}
+        return RoleSnapshot(admins, subadmins)
+
+
+class RoleRegistry:
+    """
+    The roles of the users, checked in memory on every update.
+
+    The roles live in the roles table. The registry keeps an immutable
+    snapshot of them: a role check is a frozenset lookup, and a change
+    swaps in a new snapshot with one assignment, so readers in any thread
+    or task always see a complete snapshot without locking.
+
+    When there is no admin in the database, the admins from the settings
+    are stored on load.
+
+    Attributes:
+        session_pool: Session pool object for the database using SQLAlchemy.
+        initial_admins (list[int]): The admins from the settings.
+    """
+
+    def __init__(self,
+                 session_pool,
+                 initial_admins: Iterable[int] = ()) -> None:
+        self.session_pool = session_pool
+        self.initial_admins = list(initial_admins)
+        self._snapshot = RoleSnapshot()
+        # serializes the writers, the readers never wait
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> RoleSnapshot:
+        return self._snapshot
+
+    @property
+    def admins(self) -> frozenset[int]:
+        return self._snapshot.admins
+
+    @property
+    def subadmins(self) -> frozenset[int]:
+        return self._snapshot.subadmins
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self._snapshot.admins
+
+    def is_subadmin(self, user_id: int) -> bool:
+        return user_id in self._snapshot.subadmins
+
+    async def load(self) -> None:
+        """
+        Reads the roles from the database and replaces the snapshot.
+        """
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session)
+            roles = await repo.roles.get_roles()
+            if self.initial_admins and not any(role == ADMIN for _, role in roles):
+                await repo.roles.add_roles(self.initial_admins, ADMIN)
+                roles = await repo.roles.get_roles()
+        snapshot = RoleSnapshot.from_roles(roles)
+        with self._lock:
+            self._snapshot = snapshot
+        logger.info("Loaded %s admins and %s subadmins",
+                    len(snapshot.admins), len(snapshot.subadmins))
+
+    async def grant(self,
+                    repo: RequestsRepo,
+                    user_id: int,
+                    role: str) -> None:
+        """
+        Gives the user the role and commits it.
+
+        Args:
+            repo (RequestsRepo): The repository of the update.
+            user_id (int): The unique identifier of the user.
+            role (str): The role, ADMIN or SUBADMIN.
+        """
+        await repo.roles.set_role(user_id, role)
+        await repo.commit()
+        self._swap(user_id, role)
+
+    async def revoke(self,
+                     repo: RequestsRepo,
+                     user_id: int) -> None:
+        """
+        Takes the role away from the user and commits it.
+
+        Args:
+            repo (RequestsRepo): The repository of the update.
+            user_id (int): The unique identifier of the user.
+        """
+        await repo.roles.remove_role(user_id)
+        await repo.commit()
+        self._swap(user_id, None)
+
+    def _swap(self, user_id: int, role: Optional[str]) -> None:
+        with self._lock:
+            self._snapshot = self._snapshot.with_role(user_id, role)
+
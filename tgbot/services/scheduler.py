@@ -1,27 +1,478 @@
+import asyncio
+import heapq
 import logging
-from typing import Union
-
-from aiogram import Bot
-from aiogram.types import FSInputFile
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Optional, get_args
 
 from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.config import MisfirePolicy
+from tgbot.services.outbox import OutboxWorker
+from tgbot.services.shards import shard_of
+
+logger = logging.getLogger(__name__)
+
+# what to do with the posting times a channel missed while the bot was down:
+# drop them, publish one post for all of them or publish up to N of them
+MISFIRE_POLICIES = get_args(MisfirePolicy)
+# seconds between the catch-up posts of one channel
+CATCHUP_SPACING = 5
+# the advisory lock held by the replica running the scheduler
+LEADER_LOCK_KEY = 0x706f7374
+
+
+async def enqueue_next_post(channel_id: int,
+                            due: int,
+                            repo: RequestsRepo) -> bool:
+    """
+    Moves the channel to its next post and puts that post into the outbox.
+
+    The publication is keyed by the channel and its due time, so firing the
+    same due time twice (e.g. after a restart) does not post twice.
+
+    Args:
+        channel_id (int): The unique identifier of the channel.
+        due (int): The timestamp the post is due at.
+        repo (RequestsRepo): The repository to write to.
+
+    Returns:
+        bool: True if a post was queued.
+    """
+    return await repo.outbox.enqueue_next_post(
+        channel_id,
+        idempotency_key=f"post:{channel_id}:{due}",
+        posted_at=datetime.fromtimestamp(due))
+
+
+def jitter_offset(channel_id: int, max_jitter: int) -> timedelta:
+    """
+    Returns the fixed posting delay of the channel, below `max_jitter` seconds.
+
+    The delay is derived from the channel id alone, so it is the same on every
+    run and on every replica, while channels that picked the same posting
+    time end up spread over the jitter window.
+    """
+    if max_jitter <= 0:
+        return timedelta()
+    # Knuth's multiplicative hash spreads neighbouring ids over the window
+    spread = (channel_id * 2654435761) % 2 ** 32
+    return timedelta(seconds=spread * max_jitter // 2 ** 32)
+
+
+def next_fire_time(post_interval: timedelta,
+                   now: datetime,
+                   last_post_at: Optional[datetime] = None,
+                   jitter: timedelta = timedelta()) -> datetime:
+    """
+    Returns the first posting time of the channel after the given moment.
+
+    The interval is read the way the channel settings store it: the days part
+    is the period in days (0 means every day), the rest is the time of the
+    day. Posting times are anchored to the day of the last post, so "every
+    3 days at 12:30" keeps its rhythm across restarts; a channel that never
+    posted starts at the next occurrence of its time of the day.
+
+    Args:
+        post_interval (timedelta): The posting interval of the channel.
+        now (datetime): The moment to search from.
+        last_post_at (Optional[datetime]): When the channel last posted.
+        jitter (timedelta): The fixed delay of the channel, see `jitter_offset`.
+
+    Returns:
+        datetime: The next posting time.
+    """
+    days, time_of_day = divmod(post_interval, timedelta(days=1))
+    period = timedelta(days=max(days, 1))
+
+    if last_post_at is None:
+        candidate = datetime.combine(now.date(), datetime.min.time()) + time_of_day + jitter
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate
+
+    last_day = (last_post_at - jitter).date()
+    candidate = (datetime.combine(last_day, datetime.min.time())
+                 + period + time_of_day + jitter)
+    if candidate <= now:
+        # skip the missed posting times, keeping the rhythm of the period
+        candidate += period * math.ceil((now - candidate) / period)
+        if candidate <= now:
+            candidate += period
+    return candidate
+
+
+def missed_fire_times(post_interval: timedelta,
+                      now: datetime,
+                      last_post_at: Optional[datetime],
+                      jitter: timedelta = timedelta(),
+                      limit: int = 1) -> list[datetime]:
+    """
+    Returns the latest posting times the channel missed since its last post.
+
+    Args:
+        post_interval (timedelta): The posting interval of the channel.
+        now (datetime): The current moment.
+        last_post_at (Optional[datetime]): When the channel last posted.
+        jitter (timedelta): The fixed delay of the channel, see `jitter_offset`.
+        limit (int): The maximum number of posting times to return.
+
+    Returns:
+        list[datetime]: Up to `limit` missed posting times, oldest first.
+    """
+    if last_post_at is None or limit <= 0:
+        return []
+
+    days, time_of_day = divmod(post_interval, timedelta(days=1))
+    period = timedelta(days=max(days, 1))
+    first = (datetime.combine((last_post_at - jitter).date(), datetime.min.time())
+             + period + time_of_day + jitter)
+    if first > now:
+        return []
+
+    missed = (now - first) // period + 1
+    return [first + period * index
+            for index in range(max(0, missed - limit), missed)]
+
+
+class PostingScheduler:
+    """
+    Publishing engine for the posting jobs of all channels.
+
+    Due times live in a single heap of `(due, channel_id)` pairs with whole
+    second resolution, so the engine wakes up once per due instant and
+    dispatches every channel due at that instant as one batch. Per channel it
+    keeps only the heap pair and one `(due, interval)` record in whole
+    seconds; replaced or removed jobs leave stale heap pairs that are
+    dropped when popped.
+
+    The `channels` table is the job store: a channel with `bot_is_on == "on"`,
+    its `post_interval` and `last_post_at` fully describe its job, so jobs
+    survive restarts and are rebuilt by `restore` with a single query. Due
+    posts are put into the outbox, the outbox worker delivers them.
+
+    Only one replica runs the engine, see `LeaderElection`, or in the
+    sharded mode every worker process runs the jobs of the shards assigned
+    to it, see `ShardCoordinator` and `assign`. Jobs changed on the other
+    replicas reach the owner through `sync`, which runs as soon as a change
+    is announced with `request_sync` and every `sync_interval` seconds as a
+    fallback; a post queued twice around a change of owner is dropped by the
+    outbox thanks to its key.
+
+    Posting times missed during downtime are handled by the misfire policy
+    of the channel (see `MISFIRE_POLICIES`). The first catch-up posts of all
+    channels are spread over the catch-up window and the following ones are
+    `CATCHUP_SPACING` seconds apart, so recovery is a ramp rather than a
+    burst. A catch-up post is keyed by the posting time it replaces, so a
+    restart in the middle of the recovery does not post it twice.
+
+    Attributes:
+        session_pool: Session pool object for the database using SQLAlchemy.
+        outbox (OutboxWorker): The worker delivering the queued posts.
+        jitter (int): The bound of the per-channel posting delay, in seconds.
+        misfire_policy (str): The misfire policy of channels without their own.
+        misfire_replay_limit (int): The replay limit of channels without their own.
+        catchup_window (int): Seconds the first catch-up posts are spread over.
+        max_concurrency (int): The maximum number of posts queued at once.
+        sync_interval (int): Seconds between syncs of the jobs with the database, 0 - only on request.
+        shards (int): The number of shards the channels are split into.
+        owned (Optional[set[int]]): The shards run by this engine, None for all of them.
+    """
+
+    def __init__(self,
+                 session_pool,
+                 outbox: OutboxWorker,
+                 jitter: int = 0,
+                 misfire_policy: str = "coalesce",
+                 misfire_replay_limit: int = 3,
+                 catchup_window: int = 300,
+                 max_concurrency: int = 50,
+                 sync_interval: int = 30,
+                 shards: int = 1) -> None:
+        self.session_pool = session_pool
+        self.outbox = outbox
+        self.jitter = jitter
+        self.misfire_policy = misfire_policy
+        self.misfire_replay_limit = misfire_replay_limit
+        self.catchup_window = catchup_window
+        self.max_concurrency = max_concurrency
+        self.sync_interval = sync_interval
+        self.shards = shards
+        self.owned: Optional[set[int]] = None if shards == 1 else set()
+
+        self._heap: list[tuple[int, int]] = []
+        # channel_id -> (due, post interval in seconds)
+        self._jobs: dict[int, tuple[int, int]] = {}
+        # missed posting times still to publish, only for channels catching up
+        self._catchup: dict[int, list[int]] = {}
+        self._wakeup = asyncio.Event()
+        self._runner: asyncio.Task | None = None
+        self._syncer: asyncio.Task | None = None
+        self._sync_requested = asyncio.Event()
+        self._batches: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def start(self) -> None:
+        """Starts the engine loop and the job sync in the background."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+        if self._syncer is None:
+            self._syncer = asyncio.create_task(self._sync_loop())
+
+    async def shutdown(self) -> None:
+        """Stops the engine loop and the job sync and waits for the running batches."""
+        for task in (self._runner, self._syncer):
+            if task is not None:
+                task.cancel()
+        self._runner = self._syncer = None
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def owns(self, channel_id: int) -> bool:
+        """Checks whether the job of the channel belongs to this engine."""
+        return self.owned is None or shard_of(channel_id, self.shards) in self.owned
+
+    async def assign(self, owned: set[int]) -> None:
+        """
+        Switches the engine to the jobs of the given shards.
+
+        Args:
+            owned (set[int]): The shards to run, an empty set stops the engine.
+        """
+        await self.shutdown()
+        self.owned = owned
+        self._heap.clear()
+        self._jobs.clear()
+        self._catchup.clear()
+        if owned:
+            await self.restore()
+            self.start()
+
+    def _push(self, channel_id: int, due: int, interval: int) -> None:
+        self._jobs[channel_id] = (due, interval)
+        heapq.heappush(self._heap, (due, channel_id))
+        if self._heap[0] == (due, channel_id):
+            self._wakeup.set()
+
+    def _next_due(self,
+                  channel_id: int,
+                  interval: int,
+                  last_post_at: Optional[datetime]) -> int:
+        return int(next_fire_time(timedelta(seconds=interval),
+                                  datetime.now(),
+                                  last_post_at,
+                                  jitter_offset(channel_id, self.jitter)).timestamp())
+
+    def schedule(self,
+                 channel_id: int,
+                 post_interval: timedelta,
+                 last_post_at: Optional[datetime] = None) -> None:
+        """
+        Adds the posting job of the channel, replacing the existing one.
+
+        Does nothing while the engine is not running in this process: the
+        running engine picks the job up on its next sync.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+            post_interval (timedelta): The posting interval of the channel.
+            last_post_at (Optional[datetime]): When the channel last posted.
+        """
+        if self._runner is None or not self.owns(channel_id):
+            # the owner of the channel picks the job up on its next sync
+            return
+        interval = int(post_interval.total_seconds())
+        self._catchup.pop(channel_id, None)
+        self._push(channel_id,
+                   self._next_due(channel_id, interval, last_post_at),
+                   interval)
+        logger.info("JOB ADDED: %s", channel_id)
+
+    def unschedule(self, channel_id: int) -> None:
+        """
+        Removes the posting job of the channel if there is one.
+
+        Does nothing while the engine is not running in this process.
+
+        Args:
+            channel_id (int): The unique identifier of the channel.
+        """
+        if self._runner is None or not self.owns(channel_id):
+            return
+        self._catchup.pop(channel_id, None)
+        if self._jobs.pop(channel_id, None) is None:
+            logger.info("NO JOB BY THE ID OF %s WAS FOUND", channel_id)
+            return
+        logger.info("JOB REMOVED: %s", channel_id)
+
+    async def restore(self) -> int:
+        """
+        Rebuilds the jobs of all active channels from the database.
+
+        Returns:
+            int: The number of restored jobs.
+        """
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session)
+            channels = await repo.channels.get_active_channels(
+                self.shards, None if self.owned is None else list(self.owned))
+
+        self._jobs.clear()
+        self._catchup.clear()
+        now = datetime.now()
+        catching_up = []
+        for channel in channels:
+            interval = int(channel.post_interval.total_seconds())
+            missed = self._missed_slots(channel, now)
+            if missed:
+                self._catchup[channel.channel_id] = missed
+                catching_up.append((channel.channel_id, interval))
+            else:
+                self._jobs[channel.channel_id] = (
+                    self._next_due(channel.channel_id, interval, channel.last_post_at),
+                    interval)
+
+        # spread the first catch-up post of every channel over the window
+        start = int(time.time())
+        for index, (channel_id, interval) in enumerate(catching_up):
+            self._jobs[channel_id] = (start + self.catchup_window * index
+                                      // len(catching_up), interval)
+
+        self._heap = [(due, channel_id)
+                      for channel_id, (due, _) in self._jobs.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+        logger.info("%s posting jobs restored, %s channels catching up",
+                    len(channels), len(catching_up))
+        return len(channels)
+
+    async def sync(self) -> None:
+        """
+        Brings the jobs in line with the active channels in the database.
+
+        Picks up the channels turned on or off and the intervals changed on
+        the other replicas, the jobs that did not change keep their due time.
+        """
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session)
+            channels = await repo.channels.get_active_channels(
+                self.shards, None if self.owned is None else list(self.owned))
+
+        active = set()
+        for channel in channels:
+            active.add(channel.channel_id)
+            job = self._jobs.get(channel.channel_id)
+            if job is None or job[1] != int(channel.post_interval.total_seconds()):
+                self.schedule(channel.channel_id,
+                              channel.post_interval,
+                              channel.last_post_at)
+        for channel_id in self._jobs.keys() - active:
+            self.unschedule(channel_id)
+
+    def request_sync(self) -> None:
+        """Makes the job sync run now, the requests made while it runs are served by one more run."""
+        self._sync_requested.set()
+
+    async def _sync_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._sync_requested.wait(),
+                                       self.sync_interval or None)
+            except asyncio.TimeoutError:
+                pass
+            self._sync_requested.clear()
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync the posting jobs")
+
+    def _missed_slots(self, channel, now: datetime) -> list[int]:
+        policy = channel.misfire_policy or self.misfire_policy
+        if policy == "skip":
+            return []
+        limit = 1
+        if policy == "replay":
+            limit = channel.misfire_replay_limit or self.misfire_replay_limit
+        missed = missed_fire_times(channel.post_interval,
+                                   now,
+                                   channel.last_post_at,
+                                   jitter_offset(channel.channel_id, self.jitter),
+                                   limit)
+        return [int(slot.timestamp()) for slot in missed]
+
+    def _pop_due_batch(self) -> list[tuple[int, int]]:
+        """
+        Pops the channels due at the earliest instant with the posting time each one publishes.
+        """
+        due = self._heap[0][0]
+        batch = []
+        while self._heap and self._heap[0][0] == due:
+            _, channel_id = heapq.heappop(self._heap)
+            job = self._jobs.get(channel_id)
+            if job is None or job[0] != due:
+                continue
+            interval = job[1]
+
+            slots = self._catchup.get(channel_id)
+            if slots:
+                slot = slots.pop(0)
+                if slots:
+                    next_due = int(time.time()) + CATCHUP_SPACING
+                else:
+                    del self._catchup[channel_id]
+                    next_due = self._next_due(channel_id, interval,
+                                              datetime.fromtimestamp(slot))
+            else:
+                slot = due
+                next_due = self._next_due(channel_id, interval,
+                                          datetime.fromtimestamp(due))
+            batch.append((channel_id, slot))
+            self._push(channel_id, next_due, interval)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch = self._pop_due_batch()
+            if batch:
+                task = asyncio.create_task(self._dispatch(batch))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch: list[tuple[int, int]]) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def publish(channel_id: int, due: int) -> None:
+            async with semaphore:
+                await self.publish(channel_id, due)
+
+        logger.info("Publishing a batch of %s posts", len(batch))
+        await asyncio.gather(*(publish(channel_id, due)
+                               for channel_id, due in batch))
+        self.outbox.wake()
 
+    async def publish(self, channel_id: int, due: int) -> None:
+        """
+        Queues the next post of the channel in its own database session.
 
-async def send_message_interval(
-    chat_id: Union[int, str],
-    bot: Bot,
-    repo: RequestsRepo,
-) -> bool:
-    channel = await repo.channels.get_channel_with_posts(chat_id)
-    channel_job = channel.channel_job
-
-    if channel_job == len(channel.posts):
-        channel_job = 1
-        await repo.channels.update_channel_job(channel_id=chat_id, channel_job=channel_job)
-
-    post = channel.posts[channel_job - 1]
-    if post.images:
-        await bot.send_photo(chat_id=chat_id, photo=post.images[0].image_id, caption=post.text)
-    else:
-        await bot.send_message(chat_id=chat_id, text=post.text)
-    await repo.channels.update_channel_job(channel_id=chat_id, channel_job=channel_job + 1)
+        Args:
+            channel_id (int): The unique identifier of the channel.
+            due (int): The timestamp the post is due at.
+        """
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session)
+            try:
+                await enqueue_next_post(channel_id, due, repo)
+            except Exception:
+                logger.exception("Failed to publish a post to %s", channel_id)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from infrastructure.database.repo.requests import RequestsRepo
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(channel_id: int, shards: int) -> int:
+    """
+    Returns the shard of the channel, the same way the database query computes it.
+
+    Channel ids are negative, so the shard is taken from the absolute value.
+    """
+    return abs(channel_id) % shards
+
+
+class ShardCoordinator:
+    """
+    Splits the shards of the posting jobs between the live worker processes.
+
+    The assignment lives in the `scheduler_shards` table. Every `interval`
+    seconds a worker reports itself alive, renews the leases of its shards
+    and compares their number with its fair share, `ceil(shards / workers)`:
+    extra shards are given back, missing ones are claimed from the shards
+    without an owner. So when a worker joins, the others hand shards over to
+    it within one interval, and when a worker leaves, its shards are released
+    right away or, if it crashed, once their lease expires.
+
+    Attributes:
+        session_pool: Session pool object for the database using SQLAlchemy.
+        worker_id (str): The unique identifier of this worker process.
+        shards (int): The total number of shards.
+        on_change: Coroutine called with the set of owned shards whenever it changes.
+        interval (float): Seconds between assignment rounds.
+        lease (timedelta): How long a shard stays owned without renewal.
+    """
+
+    def __init__(self,
+                 session_pool,
+                 worker_id: str,
+                 shards: int,
+                 on_change: Callable[[set[int]], Awaitable],
+                 interval: float = 5.0,
+                 lease: timedelta = timedelta(seconds=15)) -> None:
+        self.session_pool = session_pool
+        self.worker_id = worker_id
+        self.shards = shards
+        self.on_change = on_change
+        self.interval = interval
+        self.lease = lease
+
+        self.owned: set[int] = set()
+        # False after a failed on_change, so the next round applies the shards again
+        self._applied = True
+        self._renewed_at = 0.0
+        self._runner: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Starts taking part in the shard assignment in the background."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Stops running the owned shards and hands them over to the other workers."""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        await self._apply(set())
+        async with self.session_pool() as session:
+            await RequestsRepo(session).shards.leave(self.worker_id)
+        logger.info("Worker %s left the shard assignment", self.worker_id)
+
+    async def _run(self) -> None:
+        prepared = False
+        while True:
+            try:
+                if not prepared:
+                    async with self.session_pool() as session:
+                        await RequestsRepo(session).shards.ensure_shards(self.shards)
+                    prepared = True
+                await self.rebalance()
+            except Exception:
+                logger.exception("Failed to rebalance the scheduler shards")
+                if time.monotonic() - self._renewed_at > self.lease.total_seconds():
+                    # the leases are gone, other workers may run the shards by now
+                    await self._apply(set())
+            await asyncio.sleep(self.interval)
+
+    async def rebalance(self) -> None:
+        """
+        Runs one assignment round and applies its result.
+        """
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session)
+            workers = await repo.shards.heartbeat(
+                self.worker_id, timedelta(seconds=self.interval * 3))
+            fair_share = math.ceil(self.shards / workers)
+
+            owned = set(await repo.shards.renew(self.worker_id, self.lease))
+            self._renewed_at = time.monotonic()
+            if len(owned) > fair_share:
+                extra = sorted(owned)[fair_share:]
+                # stop running them before anybody else can take them
+                await self._apply(owned - set(extra))
+                await repo.shards.release(self.worker_id, extra)
+                owned -= set(extra)
+            elif len(owned) < fair_share:
+                owned.update(await repo.shards.claim(self.worker_id,
+                                                     fair_share - len(owned),
+                                                     self.lease))
+        await self._apply(owned)
+
+    async def _apply(self, owned: set[int]) -> None:
+        if owned == self.owned and self._applied:
+            return
+        logger.info("Worker %s owns the shards %s", self.worker_id, sorted(owned))
+        self._applied = False
+        await self.on_change(set(owned))
+        self.owned = owned
+        self._applied = True
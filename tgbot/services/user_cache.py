@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram.types import User as TelegramUser
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """
+    The fields of a user the bot stores, as last written to the database.
+
+    Attributes:
+        user_id (int): The unique identifier of the user.
+        username (Optional[str]): The username stored for the user.
+        tg_first_name (Optional[str]): The first name of the user.
+        tg_last_name (Optional[str]): The last name of the user.
+        tg_username (Optional[str]): The Telegram username of the user.
+    """
+
+    user_id: int
+    username: Optional[str]
+    tg_first_name: Optional[str]
+    tg_last_name: Optional[str]
+    tg_username: Optional[str]
+
+    @classmethod
+    def from_telegram(cls, user: TelegramUser) -> "UserSnapshot":
+        return cls(user_id=user.id,
+                   # the user_id is stored as the username
+                   username=str(user.id),
+                   tg_first_name=user.first_name,
+                   tg_last_name=user.last_name,
+                   tg_username=user.username)
+
+
+class UserCache:
+    """
+    Bounded LRU cache of the users known to be stored in the database.
+
+    An entry lives for `ttl` seconds at most, so a user removed from the
+    database behind the bot's back is written again after a while, and the
+    least recently seen users are dropped once `max_size` is reached.
+
+    Attributes:
+        max_size (int): The maximum number of cached users.
+        ttl (float): Seconds an entry is trusted.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 600) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[UserSnapshot, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        """
+        Returns the cached snapshot of the user, None if it is unknown or expired.
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        snapshot, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return snapshot
+
+    def put(self, snapshot: UserSnapshot) -> None:
+        """
+        Remembers the snapshot as the stored state of the user.
+        """
+        self._entries[snapshot.user_id] = (snapshot, time.monotonic() + self.ttl)
+        self._entries.move_to_end(snapshot.user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Forgets the user, the next update from it is written to the database.
+        """
+        self._entries.pop(user_id, None)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from dataclasses import asdict
+
+from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.services.user_cache import UserCache, UserSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class UserWriter:
+    """
+    Write-behind buffer of user upserts.
+
+    Users to write are collected for `interval` seconds, or until
+    `batch_size` of them are waiting, and written with one multi-row
+    `INSERT ... ON CONFLICT` statement, so a burst of new users costs one
+    statement per batch. A user written twice within a batch is written once
+    with its latest profile. Written users are remembered in the cache.
+
+    Attributes:
+        session_pool: Session pool object for the database using SQLAlchemy.
+        cache (UserCache): The cache of the users known to be stored.
+        interval (float): Seconds between flushes.
+        batch_size (int): The number of waiting users that triggers a flush right away.
+    """
+
+    def __init__(self,
+                 session_pool,
+                 cache: UserCache,
+                 interval: float = 0.3,
+                 batch_size: int = 500) -> None:
+        self.session_pool = session_pool
+        self.cache = cache
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._pending: dict[int, UserSnapshot] = {}
+        # resolved once the pending users are written
+        self._written: asyncio.Future | None = None
+        self._full = asyncio.Event()
+        self._closing = False
+        self._runner: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Starts flushing in the background."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Stops flushing in the background and writes the users still waiting."""
+        self._closing = True
+        self._full.set()
+        if self._runner is not None:
+            await self._runner
+            self._runner = None
+        await self.flush()
+
+    def add(self, user: UserSnapshot) -> asyncio.Future:
+        """
+        Queues the user to be written with the next batch.
+
+        Args:
+            user (UserSnapshot): The user to write.
+
+        Returns:
+            asyncio.Future: Resolved when the batch with the user is written.
+        """
+        self._pending[user.user_id] = user
+        if self._written is None:
+            self._written = asyncio.get_running_loop().create_future()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        return self._written
+
+    async def flush(self) -> None:
+        """Writes the waiting users right away."""
+        if not self._pending:
+            return
+        users, written = self._pending, self._written
+        self._pending, self._written = {}, None
+        try:
+            async with self.session_pool() as session:
+                repo = RequestsRepo(session)
+                rows = [asdict(user) for user in users.values()]
+                for start in range(0, len(rows), self.batch_size):
+                    await repo.users.upsert_users(rows[start:start + self.batch_size])
+        except Exception as e:
+            logger.exception("Failed to write %s users", len(users))
+            if not written.done():
+                written.set_exception(e)
+                # already logged, nobody may be waiting for the batch
+                written.exception()
+            return
+        for user in users.values():
+            self.cache.put(user)
+        if not written.done():
+            written.set_result(None)
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
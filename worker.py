@@ -0,0 +1,199 @@
+"""Scheduler worker process: runs posting jobs next to the bot without handling updates."""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from typing import Awaitable, Callable, Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+
+from infrastructure.database.setup import (create_direct_engine,
+                                           create_engine,
+                                           create_session_pool)
+from tgbot.config import Config, load_config
+from tgbot.middlewares.rate_limit import RateLimitMiddleware
+from tgbot.services.invalidation import InvalidationBus
+from tgbot.services.leader import LeaderElection
+from tgbot.services.outbox import OutboxWorker
+from tgbot.services.rate_limiter import RateLimiter
+from tgbot.services.scheduler import LEADER_LOCK_KEY, PostingScheduler
+from tgbot.services.shards import ShardCoordinator
+
+logger = logging.getLogger(__name__)
+
+
+def create_bot(config: Config) -> Bot:
+    """
+    Creates the bot instance with the shared rate limiter on its session.
+
+    The Telegram limit is split evenly between the processes handling
+    updates and the worker processes, each of them sends with its own limiter.
+
+    Args:
+        config (Config): The configuration object.
+
+    Returns:
+        Bot: The bot instance.
+    """
+    bot = Bot(token=config.tg_bot.token,
+              default=DefaultBotProperties(parse_mode="HTML"))
+    # every outgoing message waits for the shared rate limiter
+    bot.session.middleware(RateLimitMiddleware(
+        RateLimiter(global_rate=30 / config.processes)))
+    return bot
+
+
+def setup_scheduling(
+        config: Config,
+        bot: Bot,
+        engine,
+        session_pool,
+        bus: Optional[InvalidationBus] = None,
+) -> tuple[PostingScheduler, list[Callable[[], Awaitable]]]:
+    """
+    Starts the outbox worker and the posting scheduler of this process.
+
+    With one shard the scheduler runs only in the process elected as the
+    leader, with more shards every process runs the shards assigned to it.
+    Behind PgBouncer in transaction mode the election needs a connection to
+    Postgres itself (DB_LISTEN_HOST), otherwise the scheduler refuses to start.
+
+    Args:
+        config (Config): The configuration object.
+        bot (Bot): The bot instance.
+        engine: The database engine.
+        session_pool: Session pool object for the database using SQLAlchemy.
+        bus (Optional[InvalidationBus]): Announces the channels changed on the other replicas.
+
+    Returns:
+        tuple[PostingScheduler, list]: The scheduler and the coroutines that
+            stop everything, in the order they have to be called.
+    """
+    if (config.scheduler.shards == 1 and config.db.pgbouncer
+            and not config.db.listen_host):
+        # a session-level lock through PgBouncer could be held by two replicas at once
+        raise RuntimeError("The scheduler leader lock needs DB_LISTEN_HOST pointing to "
+                           "Postgres itself with DB_PGBOUNCER=True, or SCHEDULER_SHARDS above 1")
+
+    outbox = OutboxWorker(bot, session_pool)
+    outbox.start()
+    scheduler = PostingScheduler(
+        session_pool,
+        outbox,
+        jitter=config.scheduler.jitter,
+        misfire_policy=config.scheduler.misfire_policy,
+        misfire_replay_limit=config.scheduler.misfire_replay_limit,
+        catchup_window=config.scheduler.catchup_window,
+        sync_interval=config.scheduler.sync_interval,
+        shards=config.scheduler.shards)
+
+    if bus is not None:
+        async def on_channel_changed(key: str) -> None:
+            scheduler.request_sync()
+
+        bus.subscribe("channel", on_channel_changed)
+
+    # extra cleanups, called after the election and the outbox are stopped
+    shutdowns: list[Callable[[], Awaitable]] = []
+    if config.scheduler.shards > 1:
+        owner = ShardCoordinator(session_pool,
+                                 f"{socket.gethostname()}:{os.getpid()}",
+                                 config.scheduler.shards,
+                                 on_change=scheduler.assign,
+                                 interval=config.scheduler.election_interval)
+    else:
+        election_engine = engine
+        if config.db.pgbouncer:
+            election_engine = create_direct_engine(config.db)
+            shutdowns.append(election_engine.dispose)
+
+        async def start_scheduler() -> None:
+            await scheduler.restore()
+            scheduler.start()
+
+        # only the replica holding the lock runs the scheduler
+        owner = LeaderElection(election_engine,
+                               LEADER_LOCK_KEY,
+                               on_elected=start_scheduler,
+                               on_demoted=scheduler.shutdown,
+                               interval=config.scheduler.election_interval)
+    owner.start()
+    return scheduler, [owner.shutdown, outbox.shutdown, *shutdowns]
+
+
+def start_workers(count: int,
+                  target: Optional[Callable[[], None]] = None,
+                  name: str = "scheduler-worker") -> list[multiprocessing.Process]:
+    """
+    Starts the given number of worker processes.
+
+    Args:
+        count (int): The number of processes.
+        target (Optional[Callable]): The entry point of the processes, `main` by default.
+        name (str): The name prefix of the processes.
+
+    Returns:
+        list[multiprocessing.Process]: The started processes.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=target or main,
+                                 name=f"{name}-{index}",
+                                 daemon=True)
+                 for index in range(count)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+async def stop_workers(processes: list[multiprocessing.Process]) -> None:
+    """
+    Asks the worker processes to finish their work and waits for them.
+
+    Args:
+        processes (list[multiprocessing.Process]): The processes to stop.
+    """
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        await asyncio.to_thread(process.join, 10)
+
+
+async def run_worker() -> None:
+    """Runs the posting jobs of this process until it is asked to stop."""
+    config = load_config(".env")
+    bot = create_bot(config)
+    engine = await create_engine(config.db, echo=False, processes=config.processes)
+    session_pool = create_session_pool(engine)
+    bus = InvalidationBus(config.db.construct_listen_dsn())
+    _, shutdowns = setup_scheduling(config, bot, engine, session_pool, bus)
+    bus.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    logger.info("Scheduler worker started")
+    try:
+        await stop.wait()
+    finally:
+        await bus.shutdown()
+        for shutdown in shutdowns:
+            await shutdown()
+        await bot.session.close()
+        await engine.dispose()
+        logger.info("Scheduler worker stopped")
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(processName)s - %(name)s - %(message)s',
+    )
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()